@@ -0,0 +1,230 @@
+#---------------------------------- Imports ----------------------------------#
+import io
+import os
+import sys
+import json
+import time
+import platform
+import functools
+import contextlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from lib.constants import DATA_PATH, BENCHMARK_TOLERANCE
+from lib.clean_raw_data import clean_raw_data
+from lib.summarise_data import summarise_data, SUMMARY_FEATURES, MATCH_COLUMNS, \
+    DELIVERY_COLUMNS, _summarise_innings, _rename_delivery_columns, \
+    _domestic_innings, _summarise_matches, _summarise_wickets, \
+    _summarise_run_spread, _summarise_average, _summarise_high_score, \
+    _summarise_milestones, _summarise_batting_position, \
+    _summarise_balls_per_innings, _summarise_false_shots, \
+    _summarise_strike_rate, _summarise_team_run_contribution, \
+    _summarise_team_highest_scorer
+from lib.reduce_summary import reduce_summary
+from lib.create_model import create_model
+from lib.train_model import train_model
+from lib.test_model import test_model
+from lib.helpers import _read_dataframe
+
+# Peak memory is only reported where the resource module is available.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+#------------------------------ Benchmark Runs -------------------------------#
+def benchmark(repeats: int = 1, baseline: str = "/Benchmark_Baseline.json",
+              update_baseline: bool = False):
+    # Time the pipeline stages in order, then the summary on its clean data.
+    results = [
+        _benchmark_step(name, "stage", setup, step, repeats)
+        for name, setup, step in BENCHMARK_STAGES
+    ]
+    results += [
+        _benchmark_step(name, group, setup, step, repeats)
+        for name, group, setup, step in _summary_benchmarks()
+    ]
+
+    # Compare the results with the baseline and write them to file.
+    comparison = _compare_with_baseline(results, baseline)
+    report = {"environment": _environment(), "results": results,
+              "regressions": comparison[comparison["Regression"]]["Name"].tolist()}
+    _write_benchmark(report, "/Benchmark.json")
+    if update_baseline:
+        _write_benchmark(report, baseline)
+
+    return comparison
+
+
+# Run a step in a fresh process for each repeat, keeping the fastest time and
+# the largest peak memory.
+def _benchmark_step(name: str, group: str, setup, step, repeats: int):
+    # Prepare the inputs before forking so the workers can share them, and
+    # start each worker with only the memory in use when it is forked.
+    if setup is not None:
+        _setup_inputs(setup)
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+
+    wall_times, peak_rss = [], []
+    for _ in range(repeats):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            wall_time, rss = executor.submit(_time_step, setup, step).result()
+        wall_times.append(wall_time)
+        peak_rss.append(rss)
+
+    return {
+        "name": name, "group": group, "repeats": repeats,
+        "wall_time": min(wall_times),
+        "peak_rss_mb": None if None in peak_rss else max(peak_rss)
+    }
+
+
+# Time a step on its prepared inputs and measure the peak memory it adds to
+# them, as the peak of the process over the memory in use before the step.
+def _time_step(setup, step):
+    args = () if setup is None else _setup_inputs(setup)
+    start_rss = _peak_rss()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        step(*args)
+        wall_time = time.perf_counter() - start
+
+    peak_rss = _peak_rss()
+    return wall_time, None if peak_rss is None else peak_rss - start_rss
+
+
+# Get the peak resident memory of the current process in megabytes.
+def _peak_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+#------------------------------ Step Inputs ----------------------------------#
+# Inputs of each step, prepared once per process.
+_inputs = {}
+
+
+# Prepare the inputs of a step, reusing those already prepared.
+def _setup_inputs(setup):
+    if setup.__name__ not in _inputs:
+        _inputs[setup.__name__] = setup()
+    return _inputs[setup.__name__]
+
+
+# Create an untrained model to train.
+def _untrained_model():
+    return (create_model(),)
+
+
+# Create a trained model to test.
+def _trained_model():
+    return (train_model(create_model()),)
+
+
+# Read the clean deliveries and matches to summarise.
+def _clean_data():
+    match_data = _read_dataframe("/Matches_Clean.txt", columns=MATCH_COLUMNS)
+    match_data.rename(columns={"Match Id": "Match_ID"}, inplace=True)
+    delivery_data = _rename_delivery_columns(_read_dataframe(
+        "/Deliveries_Clean.txt", low_memory=False, columns=DELIVERY_COLUMNS))
+
+    return delivery_data, match_data
+
+
+# Build the innings table and the batters to summarise.
+def _innings_data():
+    innings_data = _summarise_innings(*_setup_inputs(_clean_data))
+    summary = pd.DataFrame({"Batter_ID": innings_data["Batter_ID"].unique()})
+
+    return summary, innings_data
+
+
+# Extract the domestic innings summarised by each helper.
+def _domestic_data():
+    return (_domestic_innings(*_setup_inputs(_innings_data)),)
+
+
+#--------------------------- Benchmark Definitions ---------------------------#
+# Pipeline stages with the setup of their inputs. The summary is timed without
+# its feature cache, which would serve every repeat after the first.
+BENCHMARK_STAGES = [
+    ("clean_raw_data", None, clean_raw_data),
+    ("summarise_data", None, functools.partial(summarise_data, cache=False)),
+    ("reduce_summary", None, reduce_summary),
+    ("train_model", _untrained_model, train_model),
+    ("test_model", _trained_model, test_model)
+]
+
+# Helpers that summarise the domestic innings of every batter.
+SUMMARY_HELPERS = [
+    _summarise_matches, _summarise_wickets, _summarise_run_spread,
+    _summarise_average, _summarise_high_score, _summarise_milestones,
+    _summarise_batting_position, _summarise_balls_per_innings,
+    _summarise_false_shots, _summarise_strike_rate,
+    _summarise_team_run_contribution, _summarise_team_highest_scorer
+]
+
+
+# Get the innings table, feature family and helper benchmarks of the summary.
+def _summary_benchmarks():
+    return [("_summarise_innings", "summary", _clean_data, _summarise_innings)] + \
+        [(spec["build"].__name__, "summary", _innings_data, spec["build"])
+         for spec in SUMMARY_FEATURES.values()] + \
+        [(helper.__name__, "helper", _domestic_data, helper)
+         for helper in SUMMARY_HELPERS]
+
+
+#------------------------------ Benchmark Output -----------------------------#
+# Compare the results with a stored baseline, flagging those that regressed.
+def _compare_with_baseline(results: list, baseline: str):
+    df = pd.DataFrame(results).rename(columns={
+        "name": "Name", "group": "Group", "wall_time": "Wall_Time",
+        "peak_rss_mb": "Peak_RSS_MB"
+    })[["Name", "Group", "Wall_Time", "Peak_RSS_MB"]]
+
+    base = pd.DataFrame(columns=["name", "wall_time", "peak_rss_mb"])
+    if os.path.exists(DATA_PATH + baseline):
+        with open(DATA_PATH + baseline) as f:
+            base = pd.DataFrame(json.load(f)["results"])
+    base = base[["name", "wall_time", "peak_rss_mb"]].rename(columns={
+        "name": "Name", "wall_time": "Baseline_Wall_Time",
+        "peak_rss_mb": "Baseline_Peak_RSS_MB"
+    })
+    df = pd.merge(left=df, right=base, on="Name", how="left")
+
+    # A step regresses when its time or memory grows beyond the tolerance.
+    df["Wall_Time_Ratio"] = df["Wall_Time"] / df["Baseline_Wall_Time"]
+    df["Peak_RSS_Ratio"] = (df["Peak_RSS_MB"].astype(float) /
+                            df["Baseline_Peak_RSS_MB"].astype(float))
+    df["Regression"] = (df["Wall_Time_Ratio"] > 1 + BENCHMARK_TOLERANCE) | \
+        (df["Peak_RSS_Ratio"] > 1 + BENCHMARK_TOLERANCE)
+
+    return df
+
+
+# Describe the machine, library versions and data sizes of a run.
+def _environment():
+    sizes = {
+        filename: os.path.getsize(DATA_PATH + "/" + filename)
+        for filename in ["Matches.txt", "Deliveries.txt"]
+        if os.path.exists(DATA_PATH + "/" + filename)
+    }
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(), "processor": platform.processor(),
+        "cpu_count": os.cpu_count(), "python": platform.python_version(),
+        "numpy": np.__version__, "pandas": pd.__version__,
+        "data_bytes": sizes
+    }
+
+
+# Write a benchmark report as JSON.
+def _write_benchmark(report: dict, filename: str):
+    with open(DATA_PATH + filename, "w") as f:
+        json.dump(report, f, indent=2)
@@ -1,39 +1,118 @@
 #---------------------------------- Imports ----------------------------------#
+import os
+import json
+import hashlib
+import numpy as np
 import pandas as pd
-from lib.constants import DATA_PATH, MIN_INNINGS
-from lib.helpers import _write_dataframe_to_file, _read_dataframe
+import lib.constants as constants
+from lib.constants import DATA_PATH, MIN_INNINGS, FORMATS, FORMAT_LABELS, \
+    HOME_NATION, INCREMENTAL_UPDATES, UPDATE_STATE_PATH, INGEST_WORKERS, \
+    RAW_DELIVERY_INDEX
+from lib.helpers import _write_dataframe_to_file, _read_dataframe, \
+    _write_dataframe_chunks, _spool_dataframe_chunks, _read_spooled_chunks, \
+    _read_dataframe_chunks, _read_dataframe_threaded, _read_row_index, \
+    _read_indexed_chunks, _read_dataframe_columns, _prefetch, _map_ordered, \
+    _remove_data_file, _apply_column_dtypes, _file_state, _file_tail_hash, \
+    _module_hash
+from lib.summarise_data import _partial_innings, _merge_partial_innings, \
+    _rename_delivery_columns, _crosstab, _source_hash
+from lib.instrumentation import _traced
+
+
+#--------------------------- Match Classification ----------------------------#
+# Match index columns carried by every delivery.
+DELIVERY_MATCH_COLUMNS = ["Is Domestic", "Is International", "Format Code"]
+
+
+# Spool of the cleaned deliveries, kept until the matches to keep are known.
+STAGED_DELIVERIES = "/Deliveries_Staged.pkl"
 
 
 #------------------------------- Data Cleaning -------------------------------#
+@_traced
 def clean_raw_data():
+    # Record the size of the raw data before reading it.
+    raw_sizes = _raw_file_sizes()
+
     # Read and basic clean match data.
     match_data = _read_match_data()
     match_data = _clean_match_data(match_data)
+    cleaned_ids = match_data["Match Id"]
 
-    # Read and basic clean delivery data.
-    delivery_data = _read_delivery_data(match_data)
-    delivery_data = _clean_delivery_data(delivery_data, match_data)
+    # Stream, basic clean and stage delivery data, recording who batted where
+    # and the matches of every delivery.
+    delivered = set()
+    innings_data, partials = _stage_delivery_data(match_data, delivered=delivered)
 
-    # Extract batters who have played at least 10 ODI and domestic innings.
-    batters_ids = _experienced_odi_batters(delivery_data, match_data)
-    batter_ids = _experienced_domestic_batters(
-        batters_ids, delivery_data, match_data)
+    # Extract batters who have played at least 10 ODI and domestic innings,
+    # and the matches batted in by the ODI batters.
+    incidence = _batter_match_incidence(innings_data)
+    _, batter_ids, kept_ids = _eligible_cohort(incidence)
     batter_data = pd.DataFrame({"Batter_ID": batter_ids})
 
     # Perform a final clean of both datasets.
-    delivery_data, match_data = _clean_matches_and_deliveries(
-        batters_ids, delivery_data, match_data)
+    match_data = _clean_matches_and_deliveries(kept_ids, match_data)
 
     # Write cleaned data to file.
+    _write_incidence(incidence)
     _write_dataframe_to_file(batter_data, "/Batter_Summary.txt")
     _write_dataframe_to_file(match_data, "/Matches_Clean.txt")
-    _write_dataframe_to_file(delivery_data, "/Deliveries_Clean.txt")
+    _write_dataframe_chunks(
+        _read_staged_deliveries(match_data), "/Deliveries_Clean.txt")
+    _remove_data_file(STAGED_DELIVERIES)
+
+    # Record the state that incremental updates start from.
+    if INCREMENTAL_UPDATES:
+        _write_update_state(raw_sizes, cleaned_ids, match_data["Match Id"],
+                            delivered, innings_data, partials)
+
+
+#--------------------------- Delivery Data Staging ---------------------------#
+# Clean each delivery chunk as it is read and spool it to disk, starting from
+# a byte offset of the raw deliveries.
+@_traced
+def _stage_delivery_data(match_data: pd.DataFrame, offset: int = 0, delivered: set = None):
+    innings_data = []
+    partials = []
+
+    # Record the matches each batter faced a delivery in, and the partial
+    # innings of each chunk that incremental updates build on.
+    def clean_chunks():
+        for chunk in _read_delivery_data(match_data, offset, delivered):
+            chunk = _apply_column_dtypes(_clean_delivery_data(chunk))
+            innings_data.append(_batter_matches(chunk))
+            if INCREMENTAL_UPDATES and not chunk.empty:
+                partials.append(_partial_innings(_rename_delivery_columns(chunk)))
+            yield chunk
+
+    _spool_dataframe_chunks(clean_chunks(), STAGED_DELIVERIES)
+
+    innings_data = pd.concat(innings_data or [pd.DataFrame(
+        columns=["Striker Id", "Match Id", "Is Domestic", "Is International"])])
+    return innings_data.drop_duplicates(ignore_index=True), \
+        _merge_partial_innings(partials) if partials else None
+
+
+# Read the staged deliveries that belong to the remaining matches.
+def _read_staged_deliveries(match_data: pd.DataFrame):
+    match_ids = match_data["Match Id"]
+    for chunk in _prefetch(_read_spooled_chunks(STAGED_DELIVERIES)):
+        yield chunk[chunk["Match Id"].isin(match_ids)]
+
+
+# Get the unique batter and match pairs in a set of deliveries.
+def _batter_matches(delivery_data: pd.DataFrame):
+    return delivery_data[
+        ["Striker Id", "Match Id", "Is Domestic", "Is International"]
+    ].drop_duplicates()
 
 
 #---------------------------- Cleaning Functions -----------------------------#
 # Clean match data.
+@_traced
 def _clean_match_data(match_data: pd.DataFrame):
     match_data = _remove_unnecessary_match_columns(match_data)
+    match_data = _classify_matches(match_data)
     match_data = _remove_female_matches(match_data)
     match_data = _remove_disability_matches(match_data)
     match_data = _remove_non_australian_matches(match_data)
@@ -44,19 +123,20 @@ def _clean_match_data(match_data: pd.DataFrame):
 
 
 # Clean delivery data.
-def _clean_delivery_data(delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    delivery_data = _remove_foreign_deliveries(delivery_data, match_data)
+@_traced
+def _clean_delivery_data(delivery_data: pd.DataFrame):
+    delivery_data = _remove_foreign_deliveries(delivery_data)
 
     return delivery_data
 
 
-# Clean both the match and delivery data.
-def _clean_matches_and_deliveries(batters: list, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
+# Clean the match data of matches without eligible batters.
+@_traced
+def _clean_matches_and_deliveries(kept_ids: np.ndarray, match_data: pd.DataFrame):
     # Filter remaining data.
-    delivery_data, match_data = _remove_empty_matches(
-        batters, delivery_data, match_data)
+    match_data = _remove_empty_matches(kept_ids, match_data)
 
-    return delivery_data, match_data
+    return match_data
 
 
 #----------------------------- Filter Functions ------------------------------#
@@ -66,6 +146,26 @@ def _remove_unnecessary_match_columns(df: pd.DataFrame):
     return df[df.columns.drop(list(df.filter(regex='Official+')))]
 
 
+# Classify each match once by its level, format and the teams playing in it.
+def _classify_matches(df: pd.DataFrame):
+    format_codes = {match_type: FORMAT_LABELS.index(label) + 1
+                    for match_type, label in FORMATS.items()}
+
+    return df.assign(**{
+        "Is Domestic": df.Series.str.contains("Domestic", na=False),
+        "Is International": df.Series.str.contains("International", na=False),
+        "Format Code": df["Match Type Id"].map(format_codes).fillna(0),
+        "Involves Home Nation": df.TeamA.str.contains(HOME_NATION, na=False) |
+                                df.TeamB.str.contains(HOME_NATION, na=False),
+        "Disability Teams": df.TeamA.str.contains("Disability", na=False).astype(int) +
+                            df.TeamB.str.contains("Disability", na=False).astype(int)
+    }).astype({
+        "Is Domestic": "int8", "Is International": "int8",
+        "Format Code": "int8", "Involves Home Nation": "int8",
+        "Disability Teams": "int8"
+    })
+
+
 # Remove female formats from match data.
 def _remove_female_matches(df: pd.DataFrame):
     return df.loc[df["Series Gender Id"] == 1]
@@ -73,110 +173,227 @@ def _remove_female_matches(df: pd.DataFrame):
 
 # Remove match data for disability teams.
 def _remove_disability_matches(df: pd.DataFrame):
-    return df[~df.TeamA.str.contains("Disability") |
-              ~df.TeamB.str.contains("Disability")]
+    return df[df["Disability Teams"] < 2]
 
 
 # Remove international games where Australia is not playing.
 def _remove_non_australian_matches(df: pd.DataFrame):
-    return df[~(df.Series.str.contains("International") &
-              ~df.TeamA.str.contains("Australia") &
-              ~df.TeamB.str.contains("Australia"))]
+    return df[~((df["Is International"] == 1) &
+                (df["Involves Home Nation"] == 0))]
 
 
 # Filter matches to only include 1-day, 4-day, 5-day, and T20.
 def _remove_uncommon_match_formats(df: pd.DataFrame):
-    return df[df["Match Type Id"].isin([1, 4, 5, 7])]
+    return df[df["Format Code"] > 0]
 
 
 # Remove international matches that are not 1 Day format.
 def _remove_non_OD_international_matches(df: pd.DataFrame):
-    return df[(df["Match Type Id"] == 1 &
-               df.Series.str.contains("International")) |
-              df.Series.str.contains("Domestic")]
+    return df[((df["Match Type Id"] == 1) & (df["Is International"] == 1)) |
+              (df["Is Domestic"] == 1)]
 
 
 # Remove deliveries to foreign batters in international one-days.
-def _remove_foreign_deliveries(delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    odis = match_data[match_data["Series"].str.contains(
-        "International")]["Match Id"].tolist()
-    return delivery_data[~(delivery_data["Match Id"].isin(odis) &
-                         ~delivery_data["Team Batting"].str.contains("Australia"))]
-
-
-# Get batters that have batted in at least 10 ODI matches.
-def _experienced_odi_batters(delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract international deliveries.
-    int_matches = match_data[match_data["Series"].str.contains(
-        "International")]["Match Id"].tolist()
-    int_deliveries = delivery_data[delivery_data["Match Id"].isin(int_matches)]
-
-    # Count number of innings per batter.
-    by_columns = ["Striker Id"]
-    aggregates = {"Match Id": pd.Series.nunique}
-    int_groupby_data = int_deliveries.groupby(by=by_columns).agg(aggregates)
-
-    # Remove batters that have batted in less than 10 international One Day innings.
-    return int_groupby_data[int_groupby_data["Match Id"] >= MIN_INNINGS].index.tolist()
-
-
-# Get batters that have batted in at least 10 domestic matches.
-def _experienced_domestic_batters(batters: list, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract domestic deliveries.
-    dom_matches = match_data[match_data["Series"].str.contains(
-        "Domestic")]["Match Id"].tolist()
-    dom_deliveries = delivery_data[delivery_data["Match Id"].isin(dom_matches)]
-
-    # Count number of innings per batter.
-    by_columns = ["Striker Id"]
-    aggregates = {"Match Id": pd.Series.nunique}
-    dom_groupby_data = dom_deliveries.groupby(by=by_columns).agg(aggregates)
-    dom_groupby_data = dom_groupby_data[dom_groupby_data.index.isin(batters)]
-
-    # Remove batters that have batted in less than 10 domestic innings.
-    return dom_groupby_data[(dom_groupby_data["Match Id"] >= MIN_INNINGS)].index.tolist()
+def _remove_foreign_deliveries(delivery_data: pd.DataFrame):
+    return delivery_data[~((delivery_data["Is International"] == 1) &
+                         ~delivery_data["Team Batting"].str.contains(HOME_NATION))]
 
 
 # Remove matches that do not contain valid batters.
-def _remove_empty_matches(batters: list, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    valid_matches = delivery_data[delivery_data["Striker Id"].isin(
-        batters)]["Match Id"].unique()
-    match_data = match_data[match_data["Match Id"].isin(valid_matches)]
-    delivery_data = delivery_data[delivery_data["Match Id"].isin(
-        valid_matches)]
-
-    return delivery_data, match_data
+def _remove_empty_matches(kept_ids: np.ndarray, match_data: pd.DataFrame):
+    return match_data[match_data["Match Id"].isin(kept_ids)]
 
 
 #-------------------------- Data Reading Functions ---------------------------#
-# Read match data.
+# Read match data, parsing it with a pool of threads when there are several.
+@_traced
 def _read_match_data():
+    if INGEST_WORKERS > 1:
+        return _apply_column_dtypes(pd.concat(
+            _read_dataframe_threaded("/Matches.txt"), ignore_index=True))
     return _read_dataframe("/Matches.txt")
 
 
-# Read delivery data.
-def _read_delivery_data(match_data):
-    # Initialise delivery data.
-    delivery_data = pd.DataFrame()
-
+# Read delivery data in chunks of deliveries from the given matches, recording
+# the matches of every delivery read.
+def _read_delivery_data(match_data: pd.DataFrame, offset: int = 0, delivered: set = None):
     # Extract important match data.
     match_ids = match_data["Match Id"]
     match_columns = set(match_data.columns)
     match_columns.remove("Match Id")
-
+    match_index = match_data.set_index("Match Id")[DELIVERY_MATCH_COLUMNS]
+
+    # Keep the deliveries of the given matches, leaving out the match columns
+    # while parsing when there are several parsing threads.
+    def kept(chunk):
+        if delivered is not None:
+            delivered.update(chunk["Match Id"].unique().tolist())
+        return chunk["Match Id"].isin(match_ids)
+
+    # Seek straight to the deliveries of the given matches when the whole
+    # file is read and can be indexed.
+    index = None
+    if RAW_DELIVERY_INDEX and not offset:
+        index = _read_row_index("/Deliveries.txt", "Match Id")
+
+    if index is not None:
+        if delivered is not None:
+            delivered.update(index["keys"].tolist())
+        chunks = _read_indexed_chunks(
+            "/Deliveries.txt", index, match_ids,
+            columns=lambda col: col not in match_columns)
+    elif INGEST_WORKERS > 1:
+        chunks = _read_dataframe_threaded(
+            "/Deliveries.txt", offset=offset, where=kept,
+            columns=lambda col: col not in match_columns)
+    else:
+        chunks = (chunk[kept(chunk)] for chunk in
+                  _read_dataframe_chunks("/Deliveries.txt", offset=offset))
+
+    # Carry the level and format of each match on its deliveries.
+    def carried(chunk):
+        chunk = chunk.drop(
+            [col for col in chunk.columns if col in match_columns], axis=1
+        )
+        return chunk.join(match_index, on="Match Id")
+
+    # Prepare the chunks in a pool of threads, in order, while a reader thread
+    # reads the next ones ahead. Without any deliveries to read, an empty
+    # chunk still carries the columns of the clean deliveries.
+    empty = True
+    for chunk in _map_ordered(carried, _prefetch(chunks)):
+        empty = False
+        yield chunk
+    if empty:
+        yield carried(_read_dataframe_columns("/Deliveries.txt"))
+
+
+#-------------------------------- Eligibility --------------------------------#
+# Find the eligible batters and kept matches for each minimum number of
+# innings, from the incidence recorded by the last clean.
+def eligible_cohorts(min_innings: list):
+    incidence = _read_incidence()
+    return {count: _eligible_cohort(incidence, count) for count in min_innings}
+
+
+# Build the incidence of batters in matches from the matches each batter
+# faced a delivery in, counting the matches of each batter at each level.
+@_traced
+def _batter_match_incidence(innings_data: pd.DataFrame):
+    batter_ids, batters = np.unique(
+        innings_data["Striker Id"].to_numpy(dtype=np.int64), return_inverse=True)
+    match_ids, matches = np.unique(
+        innings_data["Match Id"].to_numpy(dtype=np.int64), return_inverse=True)
+
+    # Keep one entry for each batter in each match.
+    pairs, first = np.unique(batters * len(match_ids) + matches, return_index=True)
+    batters, matches = np.divmod(pairs, max(len(match_ids), 1))
+    international = (innings_data["Is International"] == 1).to_numpy()[first]
+    domestic = (innings_data["Is Domestic"] == 1).to_numpy()[first]
+
+    return {
+        "batter_ids": batter_ids, "match_ids": match_ids,
+        "batters": batters, "matches": matches,
+        "odi_innings": np.bincount(batters[international], minlength=len(batter_ids)),
+        "domestic_innings": np.bincount(batters[domestic], minlength=len(batter_ids))
+    }
+
+
+# Get the batters with a minimum number of ODI innings, those of them with as
+# many domestic innings, and the matches batted in by the ODI batters.
+def _eligible_cohort(incidence: dict, min_innings: int = MIN_INNINGS):
+    odi = incidence["odi_innings"] >= min_innings
+    eligible = odi & (incidence["domestic_innings"] >= min_innings)
+
+    kept = np.zeros(len(incidence["match_ids"]), dtype=bool)
+    kept[incidence["matches"][odi[incidence["batters"]]]] = True
+
+    return incidence["batter_ids"][odi].tolist(), \
+        incidence["batter_ids"][eligible].tolist(), incidence["match_ids"][kept]
+
+
+# Write the incidence of batters in matches alongside the clean data.
+def _write_incidence(incidence: dict):
+    np.savez(DATA_PATH + "/Batter_Incidence.npz", **incidence)
+
+
+# Read the incidence of batters in matches recorded by the last clean.
+def _read_incidence():
     try:
-        for chunk in pd.read_csv(DATA_PATH + "/Deliveries.txt", delimiter="\t", chunksize=10**6, low_memory=False):
-            chunk = chunk[chunk["Match Id"].isin(match_ids)]
-            chunk.drop(
-                [col for col in chunk.columns if col in match_columns], axis=1, inplace=True
-            )
-
-            # Combine filtered deliveries into single dataframe.
-            delivery_data = pd.concat([delivery_data, chunk])
-
+        with np.load(DATA_PATH + "/Batter_Incidence.npz") as f:
+            return dict(f)
     except FileNotFoundError:
-        t = ("Delivery data file not found in the directory {}. Please restore "
-             "this file or update constants.py with the correct location.")
+        t = ("Batter_Incidence.npz was not found in the directory {}. Please "
+             "clean the raw data first.")
         raise FileNotFoundError(t.format(DATA_PATH))
 
-    return delivery_data
+
+#------------------------------- Update State --------------------------------#
+# Raw data files that incremental updates read the appended rows of.
+RAW_FILES = ["/Matches.txt", "/Deliveries.txt"]
+
+# Constants, modules and summary functions the clean data and partial innings
+# depend on.
+UPDATE_PARAMS = ["MIN_INNINGS", "FORMATS", "HOME_NATION", "COLUMN_DTYPES",
+                 "INCREMENTAL_UPDATES"]
+UPDATE_MODULES = ["lib.clean_raw_data", "lib.helpers"]
+UPDATE_CODE = [
+    _partial_innings, _merge_partial_innings, _rename_delivery_columns, _crosstab
+]
+
+
+# Get the size of each raw data file.
+def _raw_file_sizes():
+    return {filename: _file_state(filename)[0] for filename in RAW_FILES
+            if _file_state(filename) is not None}
+
+
+# Fingerprint the code and constants the state depends on. The pandas version
+# is included as the state is stored as pickles.
+def _update_key():
+    fingerprint = {
+        "pandas": pd.__version__,
+        "code": [_module_hash(module) for module in UPDATE_MODULES] +
+                [_source_hash(func) for func in UPDATE_CODE],
+        "params": {param: repr(getattr(constants, param))
+                   for param in UPDATE_PARAMS}
+    }
+    text = json.dumps(fingerprint, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# Record the raw data read, the matches cleaned and kept, the matches each
+# batter played and the merged partial innings of every cleaned match.
+@_traced
+def _write_update_state(raw_sizes: dict, cleaned_ids: pd.Series, kept_ids: pd.Series,
+                        delivered: set, innings_data: pd.DataFrame, partials: tuple):
+    dirname = DATA_PATH + UPDATE_STATE_PATH
+    os.makedirs(dirname, exist_ok=True)
+    pd.to_pickle(innings_data, dirname + "/Batter_Matches.pkl")
+    pd.to_pickle(partials, dirname + "/Innings.pkl")
+
+    state = {
+        "key": _update_key(),
+        "raw": {filename: {"offset": size, "tail": _file_tail_hash(filename, size)}
+                for filename, size in raw_sizes.items()},
+        "clean": _file_state("/Deliveries_Clean.txt"),
+        "cleaned": sorted(int(i) for i in cleaned_ids),
+        "kept": sorted(int(i) for i in kept_ids),
+        "delivered": sorted(int(i) for i in delivered)
+    }
+    with open(dirname + "/State.json.tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(dirname + "/State.json.tmp", dirname + "/State.json")
+
+
+# Read the recorded state, or None if there is none.
+def _read_update_state():
+    dirname = DATA_PATH + UPDATE_STATE_PATH
+    if not os.path.exists(dirname + "/State.json"):
+        return None
+
+    with open(dirname + "/State.json") as f:
+        state = json.load(f)
+    state["batter_matches"] = pd.read_pickle(dirname + "/Batter_Matches.pkl")
+    state["partials"] = pd.read_pickle(dirname + "/Innings.pkl")
+    return state
@@ -1,2 +1,128 @@
 DATA_PATH = "D:\Work\Storage\VRES\Cricket-Analysis\Data"
 MIN_INNINGS = 10
+
+# Number of worker processes used to summarise the data (1 runs serially).
+SUMMARY_WORKERS = 1
+
+# Summarise the deliveries in chunks of whole matches instead of in memory.
+CHUNKED_SUMMARY = False
+
+# Domestic format of each match type.
+FORMATS = {1: "One_Day", 4: "Test", 5: "Test", 7: "T20"}
+
+# Labels of the domestic formats, whose positions from 1 are the format codes
+# of the match index (0 for any other format).
+FORMAT_LABELS = list(dict.fromkeys(FORMATS.values()))
+
+# Nation whose international matches and batters are kept.
+HOME_NATION = "Australia"
+
+# Lowest score of each milestone, whose rates count the innings scoring from
+# it up to the next milestone, and the score at which the last one ends.
+MILESTONES = {
+    "Duck": 0, "Start": 1, "50": 50, "100": 100, "150": 150, "200": 200,
+    "250": 250, "300": 300
+}
+MILESTONE_LIMIT = 350
+
+# Number of rows read from large data files at a time.
+CHUNK_SIZE = 10**6
+
+# Number of threads parsing the chunks of the raw data files (1 parses them
+# in turn with a single reader).
+INGEST_WORKERS = 1
+
+# Number of chunks of the raw deliveries a reader thread reads ahead while the
+# earlier ones are cleaned (0 reads each chunk as it is used). Reading ahead
+# only helps with a spare core, so it is off by default.
+PREFETCH_DEPTH = 0
+
+# Index the byte ranges of each match in the raw deliveries, rebuilt whenever
+# the file changes, and read the deliveries of the cleaned matches from them.
+RAW_DELIVERY_INDEX = True
+
+# Number of worker processes running independent pipeline stages, and whether
+# raw inputs are fingerprinted by their contents instead of size and time.
+PIPELINE_WORKERS = 1
+PIPELINE_HASH_FILES = False
+
+# Record a trace of the pipeline steps from the start of each run.
+TRACING = False
+
+# Relative growth in time or memory over the benchmark baseline reported as
+# a regression.
+BENCHMARK_TOLERANCE = 0.2
+
+# Directory caching each summary feature family, reused until the clean data,
+# the batters or the code and constants of the family change.
+FEATURE_CACHE = True
+FEATURE_CACHE_PATH = "/Feature_Cache"
+
+# Record the state that incremental updates build on while cleaning the raw
+# data, and the directory it is kept in.
+INCREMENTAL_UPDATES = True
+UPDATE_STATE_PATH = "/Update_State"
+
+# Directory of the as-of feature store, and the format of the match dates it
+# is ordered by (None to infer it).
+FEATURE_STORE_PATH = "/Feature_Store"
+MATCH_DATE_FORMAT = None
+
+# Form features of each domestic innings: the numbers of previous innings
+# averaged over, the half-life in innings of the decayed strike rate, and the
+# days of the trailing season and the milestones it rates.
+FORM_INNINGS = [5, 10, 20]
+FORM_HALF_LIFE = 10
+FORM_SEASON_DAYS = 365
+FORM_MILESTONES = ["50", "100"]
+
+# Read the clean deliveries from memory-mapped columns sorted by match and
+# innings, indexed by the offset of each match, and the directory holding them.
+DELIVERY_STORE = True
+DELIVERY_STORE_PATH = "/Delivery_Store"
+
+# Compression of the data files written ("gzip" or "zstd", or None for plain
+# text), which also compresses their columnar caches, and the number of
+# threads encoding and compressing them. Compression requires pyarrow, and
+# compressed files are named with the suffix of their compression (.txt.gz or
+# .txt.zst), so notebooks reading the plain files need them uncompressed.
+OUTPUT_COMPRESSION = None
+OUTPUT_WORKERS = 1
+
+# Columnar cache written alongside each tab-separated data file.
+COLUMNAR_CACHE = True
+CACHE_EXTENSION = ".parquet"
+
+# Compact data types of the columns shared between pipeline stages. Integer
+# columns with missing values fall back to the nullable integer types.
+COLUMN_DTYPES = {
+    "Match Id": "int32",
+    "Match Type Id": "int8",
+    "Series Gender Id": "int8",
+    "Innings": "int8",
+    "Striker Id": "int32",
+    "Batter_ID": "int32",
+    "Batter Out Id": "Int32",
+    "Team Batting Id": "int32",
+    "Team Batting ResultId": "int8",
+    "Bat Score": "int8",
+    "Cum Inning Balls": "int16",
+    "Cum Inning Score": "int16",
+    "Cum Inning Wickets": "int8",
+    "Is Domestic": "int8",
+    "Is International": "int8",
+    "Format Code": "int8",
+    "Involves Home Nation": "int8",
+    "Disability Teams": "int8",
+    "Team Batting": "category",
+    "Striker": "category",
+    "Striker Hand": "category",
+    "How Out": "category",
+    "Inside Edge": "bool",
+    "Outside Edge": "bool",
+    "Play and Miss": "bool",
+    "Hit on Pads": "bool",
+    "Hit on Body": "bool",
+    "Contact Error": "bool",
+    "Opportunity": "bool",
+}
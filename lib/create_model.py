@@ -1,8 +1,10 @@
 #---------------------------------- Imports ----------------------------------#
 from sklearn.ensemble import RandomForestRegressor
+from lib.instrumentation import _traced
 
 
 #------------------------------ Model Creation -------------------------------#
+@_traced
 def create_model():
     # Define the optimal hyperparameters.
     params = {"bootstrap": True,
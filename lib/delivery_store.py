@@ -0,0 +1,249 @@
+#---------------------------------- Imports ----------------------------------#
+import os
+import json
+import hashlib
+import contextlib
+import numpy as np
+import pandas as pd
+from lib.constants import DATA_PATH, CHUNK_SIZE, DELIVERY_STORE_PATH
+from lib.helpers import _read_dataframe, _read_dataframe_partitions, \
+    _write_column_store_chunks, _reorder_column_store, _read_column_store, \
+    _remove_column_store, _apply_column_dtypes, _file_state, _map_array, \
+    _key_ranges, _range_rows
+from lib.instrumentation import _traced
+
+
+#------------------------------- Store Layout --------------------------------#
+# Delivery columns of the batters indexed by the store, and the name of each
+# index.
+BATTER_INDEXES = {"Striker Id": "striker", "Batter Out Id": "out"}
+
+# File in the store directory naming the version of the store to read.
+CURRENT_VERSION = "CURRENT"
+
+
+#------------------------------ Delivery Store -------------------------------#
+# Store the clean deliveries as memory-mappable columns sorted by match and
+# innings, indexing the offset of the first delivery of each match.
+@_traced
+def build_delivery_store():
+    state = _file_state("/Deliveries_Clean.txt")
+    source = {"clean": state, "indexes": list(BATTER_INDEXES.values())}
+
+    # Build a new version of the store beside the current one, a partition of
+    # whole matches at a time.
+    building = _store_path("building.{}".format(os.getpid()))
+    match_ids, offsets = _write_sorted_deliveries(
+        _read_dataframe_partitions("/Deliveries_Clean.txt", "Match Id"), building)
+
+    # Index the matches, and the batters from the mapped columns.
+    np.save(os.path.join(building, "match_ids.npy"), match_ids)
+    np.save(os.path.join(building, "offsets.npy"), offsets)
+    for col, name in BATTER_INDEXES.items():
+        _write_batter_index(_read_column_store(building, [col])[col],
+                            os.path.join(building, name))
+    with open(os.path.join(building, "source.json"), "w") as f:
+        json.dump(source, f)
+
+    _publish_store_version(building, source)
+
+
+# Write partitions of whole matches to a directory of column files, sorting
+# each by match and innings, and get the matches and the offsets of their
+# deliveries. Partitions out of order of their matches, as cleaning keeps the
+# order of the raw deliveries, are sorted once written by reordering the
+# column files.
+def _write_sorted_deliveries(partitions, dirname: str):
+    ordered, last, written = True, None, False
+
+    def sorted_partitions():
+        nonlocal ordered, last, written
+        for partition in partitions:
+            # Sort stably so the deliveries of each innings keep their order.
+            order = np.lexsort((partition["Innings"].to_numpy(),
+                                partition["Match Id"].to_numpy()))
+            partition = partition.take(order).reset_index(drop=True)
+            ids = partition["Match Id"].to_numpy()
+            if last is not None and ids[0] <= last:
+                ordered = False
+            last, written = ids[-1], True
+            yield partition
+
+    _remove_column_store(dirname)
+    _write_column_store_chunks(sorted_partitions(), dirname)
+
+    # A file without deliveries only has its columns written.
+    if not written:
+        _write_column_store_chunks(
+            [_read_dataframe("/Deliveries_Clean.txt", low_memory=False)], dirname)
+
+    keys = _read_column_store(dirname, ["Match Id", "Innings"])
+    if not ordered:
+        _reorder_column_store(dirname, np.lexsort(
+            (keys["Innings"].to_numpy(), keys["Match Id"].to_numpy())))
+        keys = _read_column_store(dirname, ["Match Id"])
+
+    match_ids, offsets = np.unique(keys["Match Id"].to_numpy(), return_index=True)
+    return match_ids, np.append(offsets, len(keys))
+
+
+# Rename a built store to its version and point readers at it, so that they
+# never see a store half written. Versions are named by their source, so a
+# store built at the same time from the same deliveries is used instead when
+# it was published first. Versions built from older deliveries are removed,
+# except the one just replaced, which readers may still be reading.
+def _publish_store_version(building: str, source: dict):
+    text = json.dumps(source, sort_keys=True)
+    version = hashlib.sha256(text.encode()).hexdigest()[:16]
+    try:
+        os.replace(building, _store_path(version))
+    except OSError:
+        if not os.path.exists(os.path.join(_store_path(version), "source.json")):
+            raise
+        _remove_column_store(building)
+
+    previous = _current_version()
+    pointer = _store_path("{}.{}".format(CURRENT_VERSION, os.getpid()))
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, _store_path(CURRENT_VERSION))
+
+    for name in os.listdir(_store_path()):
+        if name in [version, previous] or name.startswith(CURRENT_VERSION) or \
+                name.startswith("building."):
+            continue
+        if os.path.isdir(_store_path(name)):
+            if _read_store_source(_store_path(name)) != source:
+                _remove_column_store(_store_path(name))
+        else:
+            # Files of a store built before stores were versioned.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(_store_path(name))
+
+
+# Read the deliveries of the given matches, or of every match. The numeric
+# columns of a run of consecutive matches are views of the mapped files.
+@_traced
+def _read_match_deliveries(match_ids=None, columns: list = None):
+    dirname, stored_ids, offsets = _delivery_index()
+    rows = None
+    if match_ids is not None:
+        rows = _match_rows(stored_ids, offsets, np.unique(np.asarray(match_ids)))
+
+    return _apply_column_dtypes(_read_column_store(dirname, columns, rows))
+
+
+# Read every delivery in partitions of whole matches, each of about a chunk of
+# deliveries unless a single match is larger.
+def _read_delivery_partitions(chunksize: int = CHUNK_SIZE, columns: list = None):
+    dirname, _, offsets = _delivery_index()
+    starts = np.arange(0, offsets[-1], chunksize)
+    bounds = np.unique(np.append(offsets[np.searchsorted(offsets, starts)], offsets[-1]))
+
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        yield _apply_column_dtypes(
+            _read_column_store(dirname, columns, slice(start, stop)))
+
+
+# Read the deliveries faced by the given batters, or in which they were out,
+# grouped by batter in the order of the given batters and then by match.
+@_traced
+def batter_deliveries(batter_ids, columns: list = None, dismissals: bool = False):
+    batter_ids = pd.unique(np.asarray(batter_ids, dtype=np.int64))
+    dirname = _delivery_index()[0]
+    rows = _batter_rows(dirname, batter_ids, "Batter Out Id" if dismissals else "Striker Id")
+
+    return _apply_column_dtypes(_read_column_store(dirname, columns, rows))
+
+
+#------------------------------- Store Index ---------------------------------#
+# Get the directory of the current version of the store, the stored matches
+# and the offsets of their deliveries, first building the store if the clean
+# deliveries changed since it was built.
+def _delivery_index(attempts: int = 3):
+    for attempt in range(attempts):
+        if not _is_fresh_delivery_store():
+            build_delivery_store()
+
+        # Build again if the version was replaced and removed meanwhile.
+        dirname = _store_path(_current_version())
+        try:
+            return dirname, _map_array(os.path.join(dirname, "match_ids.npy")), \
+                _map_array(os.path.join(dirname, "offsets.npy"))
+        except FileNotFoundError:
+            if attempt == attempts - 1:
+                raise
+
+
+# Check that the current version of the store was built from the current clean
+# deliveries, with the current batter indexes.
+def _is_fresh_delivery_store():
+    version = _current_version()
+    if version is None:
+        return False
+    source = _read_store_source(_store_path(version))
+    return source is not None and \
+        source["clean"] == _file_state("/Deliveries_Clean.txt") and \
+        source.get("indexes") == list(BATTER_INDEXES.values())
+
+
+# Get the path of a file or version in the store directory.
+def _store_path(name: str = ""):
+    return os.path.join(DATA_PATH + DELIVERY_STORE_PATH, name)
+
+
+# Get the current version of the store, or None before it is first built.
+def _current_version():
+    if not os.path.exists(_store_path(CURRENT_VERSION)):
+        return None
+    with open(_store_path(CURRENT_VERSION)) as f:
+        return f.read().strip()
+
+
+# Read the source a version of the store was built from, or None if it is
+# missing or being removed.
+def _read_store_source(dirname: str):
+    try:
+        with open(os.path.join(dirname, "source.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# Get the rows of the deliveries of the given sorted matches, as a slice when
+# they are consecutive in the store.
+def _match_rows(stored_ids: np.ndarray, offsets: np.ndarray, match_ids: np.ndarray):
+    starts, stops = _key_ranges(stored_ids, offsets, match_ids)
+    if len(starts) == 0:
+        return slice(0, 0)
+    if (starts[1:] == stops[:-1]).all():
+        return slice(starts[0], stops[-1])
+
+    return _range_rows(starts, stops)
+
+
+# Get the rows of the deliveries of the given batters from an index.
+def _batter_rows(dirname: str, batter_ids: np.ndarray, col: str):
+    stored_ids, offsets, rows = _read_batter_index(dirname, col)
+    return rows[_range_rows(*_key_ranges(stored_ids, offsets, batter_ids))]
+
+
+#------------------------------- Batter Index --------------------------------#
+# Write an index from each batter to the rows of the deliveries naming them,
+# in the order of the store.
+def _write_batter_index(batters: pd.Series, prefix: str):
+    named = batters.notna().to_numpy()
+    rows = np.flatnonzero(named)
+    keys = batters[named].to_numpy(dtype=np.int64)
+    order = np.argsort(keys, kind="stable")
+    batter_ids, counts = np.unique(keys[order], return_counts=True)
+
+    np.save(prefix + "_batter_ids.npy", batter_ids)
+    np.save(prefix + "_offsets.npy", np.append(0, np.cumsum(counts)))
+    np.save(prefix + "_rows.npy", rows[order])
+
+
+# Map the batters of an index, the offsets of their entries and their rows.
+def _read_batter_index(dirname: str, col: str):
+    prefix = os.path.join(dirname, BATTER_INDEXES[col])
+    return tuple(_map_array(prefix + suffix) for suffix in ["_batter_ids.npy", "_offsets.npy", "_rows.npy"])
@@ -0,0 +1,304 @@
+#---------------------------------- Imports ----------------------------------#
+import numpy as np
+import pandas as pd
+from lib.constants import DATA_PATH, FORMAT_LABELS, CHUNKED_SUMMARY, \
+    MILESTONES, MILESTONE_LIMIT, FEATURE_STORE_PATH, MATCH_DATE_FORMAT
+from lib.summarise_data import SUMMARY_FEATURES, HOW_OUT_LABELS, RUN_LABELS, \
+    WIN_RESULT_IDS, _read_innings_data, _summarise_formats
+from lib.helpers import _write_dataframe_to_file, _read_dataframe, \
+    _write_column_store, _read_column_store, _remove_column_store
+from lib.instrumentation import _traced
+
+
+#------------------------------- Store Layout --------------------------------#
+# Scope of the international One-Day innings, following the domestic formats.
+ODI_SCOPE = len(FORMAT_LABELS)
+
+# Bits of the store key holding the date of an innings, counted in days from
+# the origin.
+DATE_BITS = 24
+DATE_ORIGIN = pd.Timestamp("1900-01-01")
+
+# Columns identifying the innings of the store.
+KEY_COLUMNS = ["Key", "Batter_ID", "Scope", "Date"]
+
+
+#------------------------------- Feature Store -------------------------------#
+# Store the running totals of every summary statistic of each batter, in the
+# order of the dates of their innings.
+@_traced
+def build_feature_store(chunked: bool = CHUNKED_SUMMARY):
+    # Read the batters to store and the innings they played.
+    summary = _read_dataframe("/Batter_Summary.txt", columns=["Batter_ID"])
+    innings_data = _read_innings_data(chunked)
+    innings_data = innings_data[innings_data["Batter_ID"].isin(summary["Batter_ID"])]
+
+    # Accumulate the statistics of each batter in each scope by date.
+    df = _scoped_innings(innings_data, _read_match_dates())
+    store = _accumulate_statistics(df, _innings_statistics(df))
+
+    # Write the store as memory-mappable columns.
+    dirname = DATA_PATH + FEATURE_STORE_PATH
+    _remove_column_store(dirname)
+    _write_column_store(store, dirname)
+
+
+# Summarise batters as of the given dates, counting only the innings of
+# matches played before them, or as of the end of their careers.
+@_traced
+def features_as_of(batter_ids, dates=None):
+    store = _read_column_store(DATA_PATH + FEATURE_STORE_PATH)
+    batter_ids = np.asarray(batter_ids, dtype=np.int64)
+    if dates is None:
+        days = np.full(len(batter_ids), 2**DATE_BITS - 1)
+    else:
+        days = np.broadcast_to(_date_days(pd.to_datetime(dates)), batter_ids.shape)
+
+    # Look up the running totals of each batter in each scope.
+    prefixes = [_prefix_statistics(store, batter_ids, scope, days)
+                for scope in range(ODI_SCOPE + 1)]
+
+    # Derive the domestic features of each format and the One-Day average.
+    wickets = sorted(int(col.rsplit("_", 1)[1]) for col in store.columns
+                     if col.startswith("Entering_Wicket_"))
+    features = pd.DataFrame({
+        "Domestic_{}_{}".format(format_label, name): values
+        for format_label, prefix in zip(FORMAT_LABELS, prefixes)
+        for name, values in _domestic_features(prefix, wickets).items()
+    })
+    features = _summarise_formats(features)
+    features["International_One_Day_Batting_Average"] = _odi_average(prefixes[ODI_SCOPE])
+
+    # Order the features as in the summary.
+    columns = [col for spec in SUMMARY_FEATURES.values() for col in spec["columns"]]
+    features = features[columns]
+    features.insert(0, "Batter_ID", batter_ids)
+    features.insert(1, "As_Of_Date", None if dates is None else
+                    DATE_ORIGIN + pd.to_timedelta(days, unit="D"))
+
+    return features
+
+
+# Summarise each batter as of their international One-Day debut, with the
+# One-Day average of their whole career as the target.
+@_traced
+def summarise_debuts():
+    # Find the date of each batter's first international One-Day innings.
+    store = _read_column_store(DATA_PATH + FEATURE_STORE_PATH,
+                               columns=["Batter_ID", "Scope", "Date"])
+    debuts = store[store["Scope"] == ODI_SCOPE].groupby("Batter_ID")["Date"].min()
+
+    # Summarise each batter on their debut.
+    features = features_as_of(
+        debuts.index, DATE_ORIGIN + pd.to_timedelta(debuts.to_numpy(), unit="D"))
+    features["International_One_Day_Batting_Average"] = \
+        features_as_of(debuts.index)["International_One_Day_Batting_Average"]
+
+    # Join the batter attributes and write the summary to file.
+    attributes = _read_dataframe("/Batter_Summary.txt",
+                                 columns=["Batter_ID", "Name", "Hand"])
+    summary = pd.merge(left=attributes, right=features, on="Batter_ID")
+    _write_dataframe_to_file(summary, "/Batter_Debut_Summary.txt")
+
+    return summary
+
+
+#------------------------------ Store Building -------------------------------#
+# Read the date of each clean match.
+def _read_match_dates():
+    match_data = _read_dataframe("/Matches_Clean.txt", columns=["Match Id", "Match Date"])
+    dates = pd.to_datetime(match_data["Match Date"], format=MATCH_DATE_FORMAT,
+                           errors="coerce")
+    if dates.isna().any():
+        t = "{} matches in Matches_Clean.txt do not have a valid Match Date."
+        raise ValueError(t.format(dates.isna().sum()))
+
+    return pd.DataFrame({"Match_ID": match_data["Match Id"], "Date": _date_days(dates)})
+
+
+# Count the days of dates from the origin.
+def _date_days(dates):
+    return np.asarray((dates - DATE_ORIGIN) // pd.Timedelta(days=1), dtype=np.int64)
+
+
+# Scope the domestic innings by format, and the international One-Day innings
+# after them, ordering each batter's innings in each scope by date.
+def _scoped_innings(innings_data: pd.DataFrame, dates: pd.DataFrame):
+    scopes = {format_label: scope for scope, format_label in enumerate(FORMAT_LABELS)}
+    domestic = innings_data[innings_data["Domestic"]]
+    domestic = domestic.assign(Scope=domestic["Format"].map(scopes).astype(int))
+    odi = innings_data[(innings_data["International"]) &
+                       (innings_data["Match Type Id"] == 1)].assign(Scope=ODI_SCOPE)
+
+    df = pd.merge(left=pd.concat([domestic, odi], ignore_index=True),
+                  right=dates, on="Match_ID")
+    return df.sort_values(["Batter_ID", "Scope", "Date", "Match_ID", "Innings"],
+                          ignore_index=True)
+
+
+# Get the statistics each innings adds to the summary features.
+def _innings_statistics(df: pd.DataFrame):
+    batted = (df["Balls"] > 0).to_numpy()
+    runs, outs = df["Runs"].to_numpy(), df["Outs"].to_numpy()
+
+    # Count the innings, and each match batted and won in once.
+    first = batted & ~df[["Batter_ID", "Scope", "Match_ID"]].assign(
+        Batted=batted).duplicated().to_numpy()
+    won = first & df["Result_ID"].isin(WIN_RESULT_IDS).to_numpy()
+    stats = {
+        "Innings": np.ones(len(df), dtype=np.int64),
+        "Batted_Innings": batted.astype(np.int64),
+        "Batted_Matches": first.astype(np.int64),
+        "Won_Matches": won.astype(np.int64),
+        "Runs": runs, "Balls": df["Balls"].to_numpy(),
+        "False_Shots": df["False_Shots"].to_numpy(),
+        "Outs": outs,
+        "Known_Outs": np.where(df["How Out"].notna(), outs, 0)
+    }
+
+    # Count the balls of each run type and the dismissals of each kind.
+    for label in RUN_LABELS.values():
+        stats[label] = df[label].to_numpy()
+    for how_out, label in HOW_OUT_LABELS.items():
+        stats["{}_Outs".format(label)] = np.where(df["How Out"] == how_out, outs, 0)
+
+    # Count the batted innings reaching each milestone.
+    labels = sorted(MILESTONES, key=MILESTONES.get)
+    edges = [MILESTONES[label] for label in labels] + [MILESTONE_LIMIT]
+    bins = np.searchsorted(edges, runs, side="right") - 1
+    for i, label in enumerate(labels):
+        stats["{}_Milestones".format(label)] = (batted & (bins == i)).astype(np.int64)
+
+    # Total the batting positions of batted innings, counting each wicket
+    # entered at for the median.
+    for col in ["Entering_Ball", "Entering_Score"]:
+        stats[col] = np.where(batted, df[col].fillna(0), 0).astype(np.int64)
+    wickets = df["Entering_Wicket"].where(batted)
+    for wicket in sorted(wickets.dropna().unique()):
+        stats["Entering_Wicket_{}".format(int(wicket))] = (wickets == wicket).to_numpy(dtype=np.int64)
+
+    # Total the team scores and count the team high scores of batted innings.
+    stats["Team_Total"] = np.where(batted, df["Team_Total"].fillna(0), 0).astype(np.int64)
+    stats["Team_High_Scores"] = (batted & (runs == df["Team_High_Score"].to_numpy())).astype(np.int64)
+
+    return pd.DataFrame(stats)
+
+
+# Accumulate the statistics of each batter in each scope, keyed by the batter,
+# scope and date of each innings.
+def _accumulate_statistics(df: pd.DataFrame, stats: pd.DataFrame):
+    segment = df["Batter_ID"].to_numpy(dtype=np.int64) * (ODI_SCOPE + 1) + df["Scope"].to_numpy()
+    store = stats.groupby(segment).cumsum()
+
+    # Keep the highest score of batted innings so far.
+    store["High_Score"] = pd.Series(
+        np.where(stats["Batted_Innings"] > 0, stats["Runs"], 0)
+    ).groupby(segment).cummax()
+
+    keys = pd.DataFrame({
+        "Key": (segment << DATE_BITS) + df["Date"].to_numpy(),
+        "Batter_ID": df["Batter_ID"].to_numpy(), "Scope": df["Scope"].to_numpy(),
+        "Date": df["Date"].to_numpy()
+    })
+    return pd.concat([keys, store], axis=1)
+
+
+#------------------------------- Store Queries -------------------------------#
+# Get the running totals of batters in a scope from their last innings before
+# each date, with none for batters without innings before it.
+def _prefix_statistics(store: pd.DataFrame, batter_ids: np.ndarray, scope: int, days: np.ndarray):
+    keys = store["Key"].to_numpy()
+    segment = batter_ids * (ODI_SCOPE + 1) + scope
+    positions = np.searchsorted(keys, (segment << DATE_BITS) + days, side="left") - 1
+    found = positions >= 0
+    found[found] = (keys[positions[found]] >> DATE_BITS) == segment[found]
+    positions = np.where(found, positions, 0)
+
+    return pd.DataFrame({
+        col: np.where(found, store[col].to_numpy()[positions], 0)
+        for col in store.columns if col not in KEY_COLUMNS
+    })
+
+
+# Derive the features of a domestic format from the running totals.
+def _domestic_features(prefix: pd.DataFrame, wickets: list):
+    innings, batted = prefix["Innings"].to_numpy(), prefix["Batted_Innings"].to_numpy()
+    runs, balls = prefix["Runs"].to_numpy(), prefix["Balls"].to_numpy()
+    matches = prefix["Batted_Matches"].to_numpy()
+    features = {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Matches played, which are none before the first batted innings.
+        features["Innings_Count"] = batted
+        features["Match_Count"] = matches
+        features["Win_Rate"] = np.where(matches < 1, matches,
+                                        prefix["Won_Matches"] / matches)
+
+        # Dismissals, from every innings.
+        not_out = np.clip(batted - prefix["Known_Outs"].to_numpy(), 0, None)
+        for how_out, label in HOW_OUT_LABELS.items():
+            count = not_out if how_out == "NO" else prefix["{}_Outs".format(label)]
+            features["{}_Percent".format(label)] = np.where(
+                innings < 1, np.nan,
+                np.where(batted < 1, batted, count / batted))
+
+        # Runs.
+        for label in RUN_LABELS.values():
+            features["{}_Rate".format(label)] = np.where(
+                balls < 1, balls, prefix[label] / balls)
+        features["Runs_Per_Innings_Average"] = runs / batted
+        features["Runs_Per_Out_Average"] = np.where(
+            prefix["Outs"] > 0, runs / prefix["Outs"], np.nan)
+        features["High_Score"] = prefix["High_Score"]
+
+        # Milestones.
+        for label in MILESTONES:
+            features["{}_Rate".format(label)] = prefix["{}_Milestones".format(label)] / batted
+
+        # Batting position.
+        features["Average_Entering_Ball"] = prefix["Entering_Ball"] / batted
+        features["Average_Entering_Score"] = prefix["Entering_Score"] / batted
+        features["Average_Entering_Wicket"] = _median_wicket(prefix, wickets)
+
+        # Batting style.
+        features["Average_Ball_Count"] = balls / batted
+        features["False_Shot_Rate"] = np.where(
+            balls < 1, balls, prefix["False_Shots"] / balls)
+        features["Strike_Rate"] = np.where(balls < 1, balls, runs / balls)
+
+        # Team contribution.
+        team_total = prefix["Team_Total"].to_numpy()
+        features["Team_Run_Contribution_Percent"] = np.where(
+            team_total < 1, team_total, runs / team_total)
+        features["Team_High_Score_Percent"] = prefix["Team_High_Scores"] / batted
+
+    # Features of batted innings are missing before the first of them.
+    counts = ["Innings_Count", "Match_Count", "Win_Rate"] + \
+        ["{}_Percent".format(label) for label in HOW_OUT_LABELS.values()]
+    return {
+        name: values if name in counts else np.where(batted < 1, np.nan, values)
+        for name, values in features.items()
+    }
+
+
+# Find the median wicket batters entered at from their counts at each wicket.
+def _median_wicket(prefix: pd.DataFrame, wickets: list):
+    if not wickets:
+        return np.full(len(prefix), np.nan)
+
+    counts = prefix[["Entering_Wicket_{}".format(w) for w in wickets]].to_numpy()
+    cumulative = counts.cumsum(axis=1)
+    total = cumulative[:, -1]
+    wickets = np.array(wickets)
+    lower = wickets[np.argmax(cumulative > ((total - 1) // 2)[:, np.newaxis], axis=1)]
+    upper = wickets[np.argmax(cumulative > (total // 2)[:, np.newaxis], axis=1)]
+
+    return np.where(total < 1, np.nan, (lower + upper) / 2)
+
+
+# Derive the international One-Day average, missing without runs or outs.
+def _odi_average(prefix: pd.DataFrame):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            (prefix["Batted_Innings"] > 0) & (prefix["Outs"] > 0),
+            prefix["Runs"] / prefix["Outs"], np.nan)
@@ -0,0 +1,91 @@
+#---------------------------------- Imports ----------------------------------#
+import numpy as np
+import pandas as pd
+from lib.constants import FORMAT_LABELS, CHUNKED_SUMMARY, MILESTONES, \
+    FORM_INNINGS, FORM_HALF_LIFE, FORM_SEASON_DAYS, FORM_MILESTONES
+from lib.summarise_data import _read_innings_data, _batted_innings
+from lib.feature_store import ODI_SCOPE, DATE_BITS, DATE_ORIGIN, \
+    _read_match_dates, _scoped_innings
+from lib.helpers import _write_dataframe_to_file
+from lib.instrumentation import _traced
+
+
+#------------------------------- Form Features -------------------------------#
+# Summarise the form of every domestic batter entering each of their batted
+# innings, from the innings of matches played before it in the same format.
+@_traced
+def summarise_form(chunked: bool = CHUNKED_SUMMARY):
+    # Order the batted domestic innings of each batter in each format by date.
+    innings_data = _read_innings_data(chunked)
+    df = _scoped_innings(_batted_innings(innings_data), _read_match_dates())
+    df = df[df["Scope"] < ODI_SCOPE].reset_index(drop=True)
+
+    # Compute the form features over windows of the previous innings.
+    form = pd.DataFrame({
+        "Batter_ID": df["Batter_ID"],
+        "Format": np.array(FORMAT_LABELS)[df["Scope"].to_numpy()],
+        "Match_ID": df["Match_ID"], "Innings": df["Innings"],
+        "Date": DATE_ORIGIN + pd.to_timedelta(df["Date"], unit="D"),
+        **_form_features(df)
+    })
+    _write_dataframe_to_file(form, "/Batter_Form.txt")
+
+    return form
+
+
+#------------------------------ Form Windows ---------------------------------#
+# Compute the form features of each innings from the previous innings of its
+# batter and format, bounding every window by positions in the ordered table.
+def _form_features(df: pd.DataFrame):
+    segment = df["Batter_ID"].to_numpy(dtype=np.int64) * (ODI_SCOPE + 1) + df["Scope"].to_numpy()
+    keys = (segment << DATE_BITS) + df["Date"].to_numpy()
+
+    # Each window ends at the first innings of the same date, and starts no
+    # earlier than the first innings of the batter in the format.
+    start = np.searchsorted(keys, segment << DATE_BITS, side="left")
+    end = np.searchsorted(keys, keys, side="left")
+
+    runs, outs = df["Runs"].to_numpy(), df["Outs"].to_numpy()
+    features = {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Averages over the last innings.
+        for count in FORM_INNINGS:
+            lower = np.maximum(end - count, start)
+            innings = end - lower
+            window_runs = _window_sum(runs, lower, end)
+            window_outs = _window_sum(outs, lower, end)
+            features["Last_{}_Runs_Per_Innings_Average".format(count)] = np.where(
+                innings < 1, np.nan, window_runs / innings)
+            features["Last_{}_Runs_Per_Out_Average".format(count)] = np.where(
+                window_outs < 1, np.nan, window_runs / window_outs)
+
+        # Strike rate with the weight of each innings halving every half-life.
+        features["Decayed_Strike_Rate"] = _decayed_strike_rate(df, segment, start, end)
+
+        # Milestone rates over the trailing season.
+        lower = np.maximum(np.searchsorted(keys, keys - FORM_SEASON_DAYS, side="left"), start)
+        innings = end - lower
+        features["Season_Innings_Count"] = innings
+        for label in FORM_MILESTONES:
+            reached = _window_sum(runs >= MILESTONES[label], lower, end)
+            features["Season_{}_Plus_Rate".format(label)] = np.where(
+                innings < 1, np.nan, reached / innings)
+
+    return features
+
+
+# Sum values over the rows from each lower position up to each upper one.
+def _window_sum(values: np.ndarray, lower: np.ndarray, upper: np.ndarray):
+    cumulative = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+    return cumulative[upper] - cumulative[lower]
+
+
+# Get the exponentially decayed strike rate of the innings before each window
+# end, missing without previous innings.
+def _decayed_strike_rate(df: pd.DataFrame, segment: np.ndarray, start: np.ndarray, end: np.ndarray):
+    decayed = df[["Runs", "Balls"]].groupby(segment).ewm(halflife=FORM_HALF_LIFE).mean()
+    decayed = decayed.droplevel(0).sort_index()
+    rate = (decayed["Runs"] / decayed["Balls"]).to_numpy()
+
+    return np.where(end > start, rate[np.maximum(end - 1, 0)], np.nan)
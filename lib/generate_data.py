@@ -0,0 +1,259 @@
+#---------------------------------- Imports ----------------------------------#
+import os
+import numpy as np
+import pandas as pd
+from lib.constants import DATA_PATH, FORMATS, HOME_NATION
+
+
+#------------------------------ Synthetic Teams ------------------------------#
+# Domestic teams of the home nation and the nations it plays internationally.
+DOMESTIC_TEAMS = [
+    "Queensland", "New South Wales", "Victoria", "Tasmania",
+    "South Australia", "Western Australia"
+]
+FOREIGN_TEAMS = ["England", "India", "New Zealand", "South Africa", "Pakistan"]
+
+# Balls per innings and innings per match of each match type.
+MATCH_BALLS = {1: 300, 3: 300, 4: 540, 5: 720, 7: 120}
+MATCH_INNINGS = {1: 2, 3: 2, 4: 4, 5: 4, 7: 2}
+
+# Runs scored from a ball and their probabilities.
+BALL_RUNS = [0, 1, 2, 3, 4, 5, 6]
+BALL_RUN_PROBABILITIES = [.45, .3, .08, .02, .12, .005, .025]
+
+# Ways of getting out, weighted by repetition, and the chance of a wicket.
+HOW_OUTS = ["C", "C", "C", "C", "B", "B", "LB", "RO", "S", "HW"]
+WICKET_PROBABILITY = .025
+
+# Delivery flags marking a false shot and the chance of each.
+FALSE_SHOT_COLUMNS = [
+    "Inside Edge", "Outside Edge", "Play and Miss", "Hit on Pads",
+    "Hit on Body", "Contact Error", "Opportunity"
+]
+FALSE_SHOT_PROBABILITY = .04
+
+# Number of matches whose deliveries are generated at a time.
+MATCH_BLOCK = 500
+
+
+#------------------------------ Data Generation ------------------------------#
+def generate_data(domestic_matches: int = 240, international_matches: int = 60,
+                  batters_per_team: int = 18, match_types: list = None,
+                  seed: int = 0, overwrite: bool = False):
+    # Refuse to replace the raw data unless asked to.
+    for filename in ["/Matches.txt", "/Deliveries.txt"]:
+        if not overwrite and os.path.exists(DATA_PATH + filename):
+            t = ("{} already exists in the directory {}. Pass overwrite=True "
+                 "to replace it with synthetic data.")
+            raise FileExistsError(t.format(filename, DATA_PATH))
+    if batters_per_team < 11:
+        raise ValueError("Each team needs at least 11 batters.")
+
+    # Create the players and the matches they play in.
+    rng = np.random.default_rng(seed)
+    players = _create_players(rng, batters_per_team)
+    match_data = _create_matches(
+        rng, domestic_matches, international_matches,
+        list(FORMATS) if match_types is None else list(match_types)
+    )
+    match_data.to_csv(DATA_PATH + "/Matches.txt", sep="\t", index=False)
+
+    # Write the deliveries in blocks of matches to bound memory use.
+    header = True
+    for start in range(0, len(match_data), MATCH_BLOCK):
+        block = match_data[start:start + MATCH_BLOCK]
+        delivery_data = _create_deliveries(rng, block, players)
+        delivery_data.to_csv(DATA_PATH + "/Deliveries.txt", sep="\t", index=False,
+                             header=header, mode="w" if header else "a")
+        header = False
+
+
+#----------------------------- Player Creation -------------------------------#
+# Create the players of every team with a batting hand and skill.
+def _create_players(rng: np.random.Generator, batters_per_team: int):
+    teams = DOMESTIC_TEAMS + FOREIGN_TEAMS
+    players = pd.DataFrame({
+        "Team": np.repeat(teams, batters_per_team),
+        "Hand": np.where(rng.random(len(teams) * batters_per_team) < .7,
+                         "Right", "Left"),
+        "Skill": rng.uniform(.6, 1.6, len(teams) * batters_per_team)
+    }, index=pd.RangeIndex(1000, 1000 + len(teams) * batters_per_team, name="Id"))
+    players["Name"] = ["Player {}".format(i) for i in players.index]
+
+    # The best domestic players of each team make up the national pool.
+    national = players[players["Team"].isin(DOMESTIC_TEAMS)].groupby(
+        "Team", sort=False
+    )["Skill"].nlargest(max(2, batters_per_team // 4))
+    players["National"] = players.index.isin(
+        national.index.get_level_values("Id"))
+
+    return players
+
+
+#------------------------------ Match Creation -------------------------------#
+# Create the matches, including some that the cleaning removes.
+def _create_matches(rng: np.random.Generator, domestic_matches: int,
+                    international_matches: int, match_types: list):
+    home, away = _domestic_fixtures(rng, domestic_matches)
+    matches = [
+        pd.DataFrame({
+            "Series": "International ODI Series", "TeamA": HOME_NATION,
+            "TeamB": rng.choice(FOREIGN_TEAMS, international_matches),
+            "Series Gender Id": 1, "Match Type Id": 1
+        }),
+        pd.DataFrame({
+            "Series": "Domestic Cup", "TeamA": home, "TeamB": away,
+            "Series Gender Id": 1,
+            "Match Type Id": rng.choice(match_types, domestic_matches)
+        }),
+        pd.DataFrame({
+            "Series": ["International Test Series", "Domestic Cup",
+                       "Domestic Cup", "Domestic Cup"],
+            "TeamA": ["England", "Queensland", "Queensland Disability",
+                      "Victoria"],
+            "TeamB": ["India", "Victoria", "Victoria Disability", "Tasmania"],
+            "Series Gender Id": [1, 2, 1, 1],
+            "Match Type Id": [5, 1, 1, 3]
+        })
+    ]
+
+    # Number the matches and play them every few days.
+    match_data = pd.concat(matches, ignore_index=True)
+    match_data = match_data.sample(frac=1, random_state=rng.integers(2**31))
+    match_data.insert(0, "Match Id", np.arange(1, len(match_data) + 1))
+    match_data["Official Umpire1"] = "Umpire"
+    match_data["Match Date"] = (pd.Timestamp("2000-01-01") + pd.to_timedelta(
+        3 * match_data["Match Id"], unit="D")).dt.strftime("%Y-%m-%d")
+
+    return match_data.reset_index(drop=True)
+
+
+# Pair distinct domestic teams for each domestic match.
+def _domestic_fixtures(rng: np.random.Generator, matches: int):
+    home = rng.integers(0, len(DOMESTIC_TEAMS), matches)
+    away = (home + rng.integers(1, len(DOMESTIC_TEAMS), matches)) % len(DOMESTIC_TEAMS)
+    teams = np.array(DOMESTIC_TEAMS)
+    return teams[home], teams[away]
+
+
+#----------------------------- Delivery Creation -----------------------------#
+# Create the deliveries of every innings in a block of matches.
+def _create_deliveries(rng: np.random.Generator, match_data: pd.DataFrame, players: pd.DataFrame):
+    pools = _batter_pools(players)
+    skill = players["Skill"].to_numpy()
+    innings = []
+
+    matches = zip(match_data["Match Id"], match_data["Series"],
+                  match_data["TeamA"], match_data["TeamB"],
+                  match_data["Match Type Id"])
+
+    for match_id, series, team_a, team_b, match_type in matches:
+        winner = rng.integers(0, 2)
+
+        for number in range(MATCH_INNINGS.get(match_type, 2)):
+            team = [team_a, team_b][number % 2]
+            pool = pools.get(team, pools[None])
+            batters = rng.choice(pool, 11, replace=False)
+            strikers, runs, out = _create_innings(
+                rng, batters, skill, MATCH_BALLS.get(match_type, 300))
+            innings.append((match_id, series, number + 1, team,
+                            1 if number % 2 == winner else 7,
+                            strikers, runs, out))
+
+    # Join the innings, repeating the details of each for all of its balls.
+    balls = np.array([len(inn[5]) for inn in innings])
+    strikers = np.concatenate([inn[5] for inn in innings])
+    runs = np.concatenate([inn[6] for inn in innings])
+    out = np.concatenate([inn[7] for inn in innings])
+    details = {
+        name: np.repeat([inn[i] for inn in innings], balls)
+        for i, name in enumerate(["Match Id", "Series", "Innings",
+                                  "Team Batting", "Team Batting ResultId"])
+    }
+
+    # Count the balls, runs and wickets before each ball of its innings.
+    starts = np.repeat(np.cumsum(balls) - balls, balls)
+    ball_numbers = np.arange(len(runs)) - starts
+    cum_runs = np.cumsum(runs) - runs
+    cum_wickets = np.cumsum(out) - out
+
+    df = pd.DataFrame({
+        "Match Id": details["Match Id"],
+        "Series": details["Series"],
+        "Innings": details["Innings"],
+        "Team Batting": details["Team Batting"],
+        "Team Batting Id": [_team_id(team) for team in details["Team Batting"]],
+        "Team Batting ResultId": details["Team Batting ResultId"],
+        "Striker Id": players.index[strikers],
+        "Striker": players["Name"].to_numpy()[strikers],
+        "Striker Hand": players["Hand"].to_numpy()[strikers],
+        "Bat Score": runs,
+        "Batter Out Id": pd.Series(players.index[strikers], dtype="Int64").where(out),
+        "How Out": np.where(out, rng.choice(HOW_OUTS, len(runs)), None),
+        "Cum Inning Balls": ball_numbers,
+        "Cum Inning Score": cum_runs - cum_runs[starts],
+        "Cum Inning Wickets": cum_wickets - cum_wickets[starts]
+    })
+
+    flags = rng.random((len(df), len(FALSE_SHOT_COLUMNS))) < FALSE_SHOT_PROBABILITY
+    for i, col in enumerate(FALSE_SHOT_COLUMNS):
+        df[col] = np.where(flags[:, i], "Y", "N")
+    df["Bowler Id"] = 1
+
+    return df
+
+
+# Get the positions of the players each team can choose from.
+def _batter_pools(players: pd.DataFrame):
+    positions = pd.Series(np.arange(len(players)), index=players.index)
+    pools = {
+        team: positions[(players["Team"] == team).to_numpy()].to_numpy()
+        for team in players["Team"].unique()
+    }
+    pools[HOME_NATION] = positions[players["National"].to_numpy()].to_numpy()
+
+    # Teams without players of their own borrow from every team.
+    pools[None] = positions.to_numpy()
+    return pools
+
+
+# Get a stable identifier for a team.
+def _team_id(team: str):
+    teams = DOMESTIC_TEAMS + FOREIGN_TEAMS + [HOME_NATION]
+    return teams.index(team) + 1 if team in teams else len(teams) + 1
+
+
+# Create the strikers, runs and wickets of an innings, one partnership at a time.
+def _create_innings(rng: np.random.Generator, batters: np.ndarray, skill: np.ndarray, limit: int):
+    runs = rng.choice(BALL_RUNS, limit, p=BALL_RUN_PROBABILITIES)
+    strikers = np.empty(limit, dtype=np.int64)
+    out = np.zeros(limit, dtype=bool)
+    crease = [batters[0], batters[1]]
+    ball = 0
+
+    for wicket in range(10):
+        # Draw the length of the partnership from the skill of its batters.
+        partnership_skill = (skill[crease[0]] + skill[crease[1]]) / 2
+        length = min(rng.geometric(WICKET_PROBABILITY / partnership_skill),
+                     limit - ball)
+
+        # The batters swap ends after an odd number of runs.
+        swaps = np.cumsum(runs[ball:ball + length] % 2)
+        swaps = np.concatenate([[0], swaps[:-1]]) % 2
+        strikers[ball:ball + length] = np.where(swaps == 0, crease[0], crease[1])
+
+        ball += length
+        if ball >= limit:
+            break
+
+        # The striker of the final ball is out and replaced by the next batter.
+        out[ball - 1] = True
+        runs[ball - 1] = 0
+        if wicket == 9:
+            break
+        striker = strikers[ball - 1]
+        partner = crease[1] if striker == crease[0] else crease[0]
+        crease = [batters[wicket + 2], partner]
+
+    # Drop the balls after the final wicket.
+    return strikers[:ball], runs[:ball], out[:ball]
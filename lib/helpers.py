@@ -1,6 +1,33 @@
 #---------------------------------- Imports ----------------------------------#
+import io
+import os
+import json
+import hashlib
+import queue
+import pickle
+import shutil
+import contextlib
+import threading
+import itertools
+import functools
+import importlib
+import ast
+import collections
+import numpy as np
 import pandas as pd
-from lib.constants import DATA_PATH
+from lib.constants import DATA_PATH, CHUNK_SIZE, COLUMNAR_CACHE, CACHE_EXTENSION, \
+    COLUMN_DTYPES, PIPELINE_HASH_FILES, INGEST_WORKERS, PREFETCH_DEPTH, \
+    OUTPUT_COMPRESSION, OUTPUT_WORKERS
+from concurrent.futures import ThreadPoolExecutor
+from lib.instrumentation import _traced, _trace_read, _trace_write, \
+    _trace_context, _in_trace_context
+
+# The columnar cache is optional and requires pyarrow.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 
 #---------------------------- Test and Training  -----------------------------#
@@ -29,18 +56,877 @@ def _create_test_train_split(df: pd.DataFrame):
 
 #------------------------- Data Reading and Writing  -------------------------#
 # Write dataframe to file.
+@_traced
 def _write_dataframe_to_file(dataframe: pd.DataFrame, filename: str):
     filename = DATA_PATH + filename
-    dataframe.to_csv(filename, sep="\t", index=False)
+    dataframe = _apply_column_dtypes(dataframe)
+    chunks = [dataframe.iloc[start:start + CHUNK_SIZE]
+              for start in range(0, max(len(dataframe), 1), CHUNK_SIZE)]
+    _write_text_chunks(chunks, filename)
+    _trace_write(_text_filename(filename))
+
+    # Write the columnar cache alongside the text file.
+    if _columnar_cache_available():
+        cache = _cache_filename(filename)
+        dataframe.to_parquet(cache + ".tmp", index=False,
+                             compression=OUTPUT_COMPRESSION or "snappy")
+        os.replace(cache + ".tmp", cache)
+        _trace_write(cache)
 
 # Read dataframe.
-def _read_dataframe(filename: str, low_memory: bool = True):
+@_traced
+def _read_dataframe(filename: str, low_memory: bool = True, columns: list = None):
+    # Prefer the columnar cache when it is at least as new as the text file.
+    cache = _cache_filename(DATA_PATH + filename)
+    if _columnar_cache_available() and _is_fresh_cache(cache, DATA_PATH + filename):
+        _trace_read(cache)
+        return _apply_column_dtypes(pd.read_parquet(cache, columns=columns))
+
+    _trace_read(_text_filename(DATA_PATH + filename))
     try:
-        df = pd.read_csv(DATA_PATH + filename, delimiter="\t",
-                      low_memory=low_memory)
+        with _open_text(_text_filename(DATA_PATH + filename)) as source:
+            df = pd.read_csv(source, delimiter="\t",
+                             low_memory=low_memory, usecols=columns,
+                             dtype=_parse_dtypes())
     except FileNotFoundError:
         t = ("{} was not found in the directory {}. Please restore "
           "this file or update constants.py with the correct location.")
         raise FileNotFoundError(t.format(filename, DATA_PATH))
 
-    return df
+    return _apply_column_dtypes(df)
+
+
+# Read the columns of a dataframe file without any of its rows.
+def _read_dataframe_columns(filename: str):
+    _trace_read(_text_filename(DATA_PATH + filename))
+    with _open_text(_text_filename(DATA_PATH + filename)) as source:
+        return _apply_column_dtypes(pd.read_csv(
+            source, delimiter="\t", nrows=0, dtype=_parse_dtypes()))
+
+
+#------------------------ Chunked Reading and Writing ------------------------#
+# Write a stream of dataframe chunks to a single file, or append them to it.
+@_traced
+def _write_dataframe_chunks(chunks, filename: str, append: bool = False):
+    filename = DATA_PATH + filename
+    cache = _cache_filename(filename)
+    writer = None
+
+    # Parquet files cannot be appended to, so when appending, the columnar
+    # cache is rewritten with its current row groups first, copied without
+    # converting them, and only kept if it was up to date. The rewrite takes
+    # time in proportion to the whole cache. It replaces the previous cache
+    # once complete.
+    cached = _columnar_cache_available() and \
+        (not append or _is_fresh_cache(cache, filename))
+    target = cache + ".tmp"
+
+    # Append each chunk to the columnar cache as it is written as text.
+    def cached_chunks():
+        nonlocal writer
+        for chunk in chunks:
+            chunk = _apply_column_dtypes(chunk)
+            if cached:
+                writer = _write_cache_chunk(writer, chunk, target)
+            yield chunk
+
+    try:
+        if append and cached:
+            parquet_file = pq.ParquetFile(cache)
+            writer = pq.ParquetWriter(target, parquet_file.schema_arrow,
+                                      compression=OUTPUT_COMPRESSION or "snappy")
+            for i in range(parquet_file.num_row_groups):
+                writer.write_table(parquet_file.read_row_group(i))
+
+        _write_text_chunks(cached_chunks(), filename, append)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(target)
+        raise
+
+    _trace_write(_text_filename(filename))
+    if writer is not None:
+        writer.close()
+        os.replace(target, cache)
+        _trace_write(cache)
+    elif cached and not append and os.path.exists(cache):
+        # A new file without any chunks has no cache to replace the old one.
+        os.remove(cache)
+
+
+# Read a dataframe in chunks, optionally only the rows after a byte offset.
+def _read_dataframe_chunks(filename: str, chunksize: int = CHUNK_SIZE, columns: list = None, offset: int = 0):
+    if offset:
+        yield from _read_appended_chunks(filename, chunksize, columns, offset)
+        return
+
+    # Prefer the columnar cache when it is at least as new as the text file.
+    cache = _cache_filename(DATA_PATH + filename)
+    if _columnar_cache_available() and _is_fresh_cache(cache, DATA_PATH + filename):
+        _trace_read(cache)
+        parquet_file = pq.ParquetFile(cache)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield _apply_column_dtypes(batch.to_pandas())
+        return
+
+    _trace_read(_text_filename(DATA_PATH + filename))
+    with contextlib.ExitStack() as stack:
+        try:
+            source = stack.enter_context(
+                _open_text(_text_filename(DATA_PATH + filename)))
+        except FileNotFoundError:
+            t = ("{} was not found in the directory {}. Please restore "
+              "this file or update constants.py with the correct location.")
+            raise FileNotFoundError(t.format(filename, DATA_PATH))
+
+        reader = pd.read_csv(source, delimiter="\t",
+                             chunksize=chunksize, low_memory=False,
+                             usecols=columns, dtype=_parse_dtypes())
+        with reader:
+            for chunk in reader:
+                yield _apply_column_dtypes(chunk)
+
+
+# Read the rows appended to a text file after a byte offset in chunks.
+def _read_appended_chunks(filename: str, chunksize: int, columns: list, offset: int):
+    _trace_read(DATA_PATH + filename)
+    with open(DATA_PATH + filename, "rb") as f:
+        # Read the header before skipping to the appended rows.
+        names = f.readline().decode().rstrip("\r\n").split("\t")
+        f.seek(offset)
+        if not f.peek(1):
+            return
+
+        reader = pd.read_csv(f, delimiter="\t", header=None, names=names,
+                             chunksize=chunksize, low_memory=False,
+                             usecols=columns, dtype=_parse_dtypes())
+        with reader:
+            for chunk in reader:
+                yield _apply_column_dtypes(chunk)
+
+
+# Read a text file in chunks of rows parsed by a pool of threads, optionally
+# only the rows after a byte offset and only those a filter keeps, which is
+# applied by the parsing threads. The chunks hold the same rows as those of
+# a single reader.
+def _read_dataframe_threaded(filename: str, chunksize: int = CHUNK_SIZE, columns=None,
+                             offset: int = 0, where=None, workers: int = INGEST_WORKERS):
+    _trace_read(DATA_PATH + filename)
+    try:
+        f = open(DATA_PATH + filename, "rb")
+    except FileNotFoundError:
+        t = ("{} was not found in the directory {}. Please restore "
+          "this file or update constants.py with the correct location.")
+        raise FileNotFoundError(t.format(filename, DATA_PATH))
+
+    with f:
+        # Read the header before skipping to the rows.
+        names = f.readline().decode().rstrip("\r\n").split("\t")
+        if offset:
+            f.seek(offset)
+
+        pieces = iter(lambda: b"".join(itertools.islice(f, chunksize)), b"")
+        yield from _map_ordered(functools.partial(
+            _parse_rows, names=names, columns=columns, where=where), pieces, workers)
+
+
+# Parse rows of a text file with its column names, keeping the rows a filter keeps.
+def _parse_rows(data: bytes, names: list, columns, where):
+    chunk = _apply_column_dtypes(pd.read_csv(
+        io.BytesIO(data), delimiter="\t", header=None, names=names,
+        low_memory=False, usecols=columns, dtype=_parse_dtypes()))
+
+    return chunk if where is None else chunk[where(chunk)]
+
+
+# Read a dataframe in chunks that never split the rows sharing a key value.
+def _read_dataframe_partitions(filename: str, key: str, chunksize: int = CHUNK_SIZE, columns: list = None):
+    carry = None
+
+    for chunk in _read_dataframe_chunks(filename, chunksize, columns):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+
+        # Hold back the rows of the last key, which may continue in the next chunk.
+        held = chunk[key] == chunk[key].iat[-1]
+        carry = chunk[held]
+        yield chunk[~held]
+
+    if carry is not None and not carry.empty:
+        yield carry
+
+
+# Spool a stream of dataframe chunks to a file of pickles, to be read back in
+# the same run without writing them as text.
+@_traced
+def _spool_dataframe_chunks(chunks, filename: str):
+    with open(DATA_PATH + filename, "wb") as f:
+        for chunk in chunks:
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+    _trace_write(DATA_PATH + filename)
+
+
+# Read back the chunks of a spooled file.
+def _read_spooled_chunks(filename: str):
+    _trace_read(DATA_PATH + filename)
+    with open(DATA_PATH + filename, "rb") as f:
+        while f.peek(1):
+            yield pickle.load(f)
+
+
+# Remove a data file in any compression, its columnar cache and its manifest.
+def _remove_data_file(filename: str):
+    filename = DATA_PATH + filename
+    for f in _text_filenames(filename) + [_cache_filename(filename),
+                                          _output_manifest_filename(filename)]:
+        if os.path.exists(f):
+            os.remove(f)
+
+
+#------------------------------ Chunk Pipelining -----------------------------#
+# Iterate over items produced by a reader thread up to a number of items ahead
+# of their use, raising any error it raises. The reads of the thread are traced
+# as those of the step iterating over the items.
+def _prefetch(items, depth: int = PREFETCH_DEPTH):
+    if depth < 1:
+        yield from items
+        return
+
+    context = _trace_context()
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    # Wait for space in the buffer until the items are no longer wanted.
+    def put(entry):
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        with _in_trace_context(context):
+            try:
+                for item in items:
+                    if not put((item, None)):
+                        return
+                put((done, None))
+            except Exception as error:
+                put((done, error))
+            finally:
+                if hasattr(items, "close"):
+                    items.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+# Apply a function to items in a pool of threads, applying it to the next
+# items while the earliest result is used, and yield the results in order.
+def _map_ordered(func, items, workers: int = INGEST_WORKERS):
+    if workers < 2:
+        yield from map(func, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) > workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+#-------------------------------- Text Output --------------------------------#
+# Suffix added to the name of a text output for each compression.
+TEXT_COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+# Write chunks of a dataframe as text, encoding and compressing them in a pool
+# of threads. A compressed file is named with the suffix of its compression,
+# and replaces the file in any other compression. A new file only replaces the
+# previous one once complete, even when there are no chunks, and a file appended to is cut back if the write
+# fails. The checksum of the bytes written is recorded in the manifest of the
+# file.
+def _write_text_chunks(chunks, filename: str, append: bool = False):
+    # Appended rows keep the compression of the file.
+    if append:
+        path = _text_filename(filename)
+        compression = _text_compression(path)
+        manifest = _read_output_manifest(filename)
+        target, start = path, os.path.getsize(path)
+    else:
+        compression = OUTPUT_COMPRESSION
+        if compression is not None and pa is None:
+            t = "Writing {} compressed with {} requires pyarrow."
+            raise ImportError(t.format(filename, compression))
+        path = filename + TEXT_COMPRESSIONS.get(compression, "")
+        manifest = {"compression": compression, "segments": []}
+        target, start = path + ".tmp", 0
+
+    encode = functools.partial(_encode_chunk, compression=compression)
+    sha, size = hashlib.sha256(), 0
+    try:
+        with open(target, "ab" if append else "wb") as f:
+            items = ((chunk, not append and i == 0)
+                     for i, chunk in enumerate(chunks))
+            for data in _map_ordered(encode, items, OUTPUT_WORKERS):
+                f.write(data)
+                sha.update(data)
+                size += len(data)
+    except BaseException:
+        if append:
+            os.truncate(target, start)
+        else:
+            os.remove(target)
+        raise
+
+    if not append:
+        os.replace(target, path)
+        for other in _text_filenames(filename):
+            if other != path and os.path.exists(other):
+                os.remove(other)
+
+    # Record the checksum of the bytes written, which cannot be verified when
+    # appending to a file without a manifest.
+    if manifest is not None:
+        manifest["segments"].append([start, size, sha.hexdigest()])
+    _write_output_manifest(filename, manifest)
+
+
+# Encode a chunk of a dataframe as tab-separated text, compressed on its own
+# so that the compressed chunks join into a single stream.
+def _encode_chunk(item: tuple, compression: str):
+    chunk, header = item
+    data = _text_column_values(chunk).to_csv(sep="\t", index=False, header=header).encode()
+    if compression is not None:
+        data = pa.Codec(compression).compress(data, asbytes=True)
+    return data
+
+
+# Get the names a text output may have, plain and in each compression.
+def _text_filenames(filename: str):
+    return [filename] + [filename + suffix for suffix in TEXT_COMPRESSIONS.values()]
+
+
+# Get the file holding a text output, which is named with the suffix of its
+# compression when compressed, or its plain name if there is no such file.
+def _text_filename(filename: str):
+    for name in _text_filenames(filename):
+        if os.path.exists(name):
+            return name
+    return filename
+
+
+# Get the compression of a text file from the suffix of its name.
+def _text_compression(filename: str):
+    for compression, suffix in TEXT_COMPRESSIONS.items():
+        if filename.endswith(suffix):
+            return compression
+    return None
+
+
+# Open a text file for reading, decompressing it when it is compressed.
+@contextlib.contextmanager
+def _open_text(filename: str):
+    compression = _text_compression(filename)
+    if compression is None:
+        yield filename
+        return
+
+    if pa is None:
+        t = "{} is compressed with {}, which requires pyarrow to read."
+        raise ImportError(t.format(filename, compression))
+    with pa.input_stream(filename, compression=compression) as stream:
+        yield stream
+
+
+# Get the manifest filename of a text output.
+def _output_manifest_filename(filename: str):
+    return os.path.splitext(filename)[0] + ".manifest.json"
+
+
+# Read the manifest of a text output, or None if it has none.
+def _read_output_manifest(filename: str):
+    if not os.path.exists(_output_manifest_filename(filename)):
+        return None
+    with open(_output_manifest_filename(filename)) as f:
+        return json.load(f)
+
+
+# Write the manifest of a text output, removing it when there is none.
+def _write_output_manifest(filename: str, manifest: dict):
+    manifest_filename = _output_manifest_filename(filename)
+    if manifest is None:
+        if os.path.exists(manifest_filename):
+            os.remove(manifest_filename)
+        return
+
+    with open(manifest_filename + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_filename + ".tmp", manifest_filename)
+
+
+# Check a text output against the checksums in its manifest, or None if it has
+# no manifest.
+def _verify_output(filename: str):
+    manifest = _read_output_manifest(DATA_PATH + filename)
+    if manifest is None:
+        return None
+
+    with open(_text_filename(DATA_PATH + filename), "rb") as f:
+        segments = manifest["segments"]
+        if os.fstat(f.fileno()).st_size != sum(size for _, size, _ in segments):
+            return False
+        for start, size, digest in segments:
+            f.seek(start)
+            if hashlib.sha256(f.read(size)).hexdigest() != digest:
+                return False
+    return True
+
+
+#------------------------------ File Fingerprints ----------------------------#
+# Fingerprint a data file by its contents, or by its size and modification time.
+def _file_fingerprint(filename: str):
+    if not os.path.exists(_text_filename(DATA_PATH + filename)):
+        return None
+    if not PIPELINE_HASH_FILES:
+        return _file_state(filename)
+
+    sha = hashlib.sha256()
+    with open(_text_filename(DATA_PATH + filename), "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# Hash the megabyte of a file before an offset, to tell whether rows were only
+# appended to it since the offset was recorded.
+def _file_tail_hash(filename: str, offset: int):
+    with open(DATA_PATH + filename, "rb") as f:
+        f.seek(max(0, offset - 2**20))
+        return hashlib.sha256(f.read(offset - f.tell())).hexdigest()
+
+
+# Hash the source code of a module.
+def _module_hash(module: str):
+    with open(importlib.import_module(module).__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Get the given modules of the package and every module of the package they
+# import, directly or through each other. The constants module is left out, as
+# the constants code depends on are fingerprinted as parameters.
+def _imported_modules(modules: list):
+    found = set()
+    todo = list(modules)
+
+    while todo:
+        module = todo.pop()
+        if module in found or module == "lib.constants" or \
+                not module.startswith("lib."):
+            continue
+        found.add(module)
+
+        with open(importlib.import_module(module).__file__) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                todo += [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                todo.append(node.module)
+
+    return sorted(found)
+
+
+# Get the size and modification time of a file, in whichever compression it
+# was written.
+def _file_state(filename: str):
+    if not os.path.exists(_text_filename(DATA_PATH + filename)):
+        return None
+    stat = os.stat(_text_filename(DATA_PATH + filename))
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+#---------------------------- Memory-Mapped Store ----------------------------#
+# Write a dataframe as a directory of memory-mappable column files.
+@_traced
+def _write_column_store(dataframe: pd.DataFrame, dirname: str):
+    os.makedirs(dirname, exist_ok=True)
+    columns = []
+
+    for i, col in enumerate(dataframe.columns):
+        values = dataframe[col]
+        column = {"name": col, "file": "{}.npy".format(i)}
+
+        # Store nullable numbers as floats and other columns as codes into a
+        # list of categories.
+        if values.dtype.kind in "biuf" and \
+                isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+            values = values.astype(
+                "float64" if values.hasnans else values.dtype.numpy_dtype)
+        elif values.dtype.kind not in "biuf":
+            values = values.astype("category")
+            column["categories"] = values.cat.categories.tolist()
+            values = values.cat.codes
+
+        np.save(os.path.join(dirname, column["file"]), values.to_numpy())
+        _trace_write(os.path.join(dirname, column["file"]))
+        columns.append(column)
+
+    with open(os.path.join(dirname, "columns.json"), "w") as f:
+        json.dump(columns, f)
+
+
+# Write chunks of a dataframe as a directory of memory-mappable column files,
+# holding a single chunk in memory. Each column is written a chunk at a time
+# and joined once its data type across the chunks is known. Columns stored as
+# codes number their values in the order they are first seen.
+@_traced
+def _write_column_store_chunks(chunks, dirname: str):
+    os.makedirs(dirname, exist_ok=True)
+    columns, pieces, categories = [], [], []
+
+    for n, chunk in enumerate(chunks):
+        if not columns:
+            columns = [{"name": col, "file": "{}.npy".format(i)}
+                       for i, col in enumerate(chunk.columns)]
+            pieces = [[] for _ in columns]
+            categories = [{} for _ in columns]
+
+        for i, column in enumerate(columns):
+            values = chunk[column["name"]]
+            coded = values.dtype.kind not in "biuf"
+            if coded:
+                values = values.astype("category")
+                for value in values.cat.categories:
+                    categories[i].setdefault(value, len(categories[i]))
+                codes = pd.Index(list(categories[i])).get_indexer(values.cat.categories)
+                values = np.append(codes, -1).astype(np.int32)[values.cat.codes]
+            elif isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+                values = values.astype(
+                    "float64" if values.hasnans else values.dtype.numpy_dtype)
+
+            pieces[i].append((os.path.join(dirname, "{}.{}.npy".format(i, n)), coded))
+            np.save(pieces[i][-1][0], np.asarray(values))
+
+    # Join the pieces of each column into a single file. A column that is
+    # empty in some chunks is only numeric in them, so those are empty codes.
+    for i, column in enumerate(columns):
+        coded = any(is_coded for _, is_coded in pieces[i])
+        arrays = [np.load(piece, mmap_mode="r") if is_coded or not coded else
+                  np.full(len(np.load(piece, mmap_mode="r")), -1, dtype=np.int32)
+                  for piece, is_coded in pieces[i]]
+        joined = np.lib.format.open_memmap(
+            os.path.join(dirname, column["file"]), mode="w+",
+            dtype=np.result_type(*arrays), shape=(sum(map(len, arrays)),))
+        start = 0
+        for array in arrays:
+            joined[start:start + len(array)] = array
+            start += len(array)
+        joined.flush()
+        del joined, arrays
+        for piece, _ in pieces[i]:
+            os.remove(piece)
+
+        if coded:
+            column["categories"] = list(categories[i])
+        _trace_write(os.path.join(dirname, column["file"]))
+
+    with open(os.path.join(dirname, "columns.json"), "w") as f:
+        json.dump(columns, f)
+
+
+# Reorder the rows of a directory of column files, a column at a time and a
+# chunk of rows of it at a time, so that no column is read into memory whole.
+@_traced
+def _reorder_column_store(dirname: str, order: np.ndarray, chunksize: int = CHUNK_SIZE):
+    with open(os.path.join(dirname, "columns.json")) as f:
+        stored = json.load(f)
+
+    for column in stored:
+        filename = os.path.join(dirname, column["file"])
+        values = np.load(filename, mmap_mode="r")
+        reordered = np.lib.format.open_memmap(
+            filename + ".tmp", mode="w+", dtype=values.dtype, shape=values.shape)
+        for start in range(0, len(order), chunksize):
+            reordered[start:start + chunksize] = values[order[start:start + chunksize]]
+        reordered.flush()
+        del reordered, values
+        os.replace(filename + ".tmp", filename)
+        _trace_write(filename)
+
+
+# Read a directory of column files, memory-mapping the numeric columns, and
+# optionally only some rows, taken before any categories are decoded so that
+# a slice of rows is not copied.
+@_traced
+def _read_column_store(dirname: str, columns: list = None, rows=None):
+    with open(os.path.join(dirname, "columns.json")) as f:
+        stored = json.load(f)
+
+    data = {}
+    for column in stored:
+        if columns is not None and column["name"] not in columns:
+            continue
+
+        values = _map_array(os.path.join(dirname, column["file"]))
+        _trace_read(os.path.join(dirname, column["file"]))
+        if rows is not None:
+            values = values[rows]
+        if "categories" in column:
+            values = pd.Categorical.from_codes(
+                values, column["categories"]).astype(object)
+        data[column["name"]] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+# Arrays mapped by this process, with the identity of the file each mapped.
+_mapped = {}
+
+
+# Map an array file, reusing its mapping until the file is replaced.
+def _map_array(filename: str):
+    stat = os.stat(filename)
+    identity = [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+    if filename not in _mapped or _mapped[filename][0] != identity:
+        _mapped[filename] = (identity, np.load(filename, mmap_mode="r"))
+
+    return _mapped[filename][1]
+
+
+# Remove a directory of column files.
+def _remove_column_store(dirname: str):
+    shutil.rmtree(dirname, ignore_errors=True)
+
+
+#------------------------------- Sorted Index --------------------------------#
+# Find the ranges of the given keys in an index of sorted keys and the offsets
+# of their entries, skipping keys that are not in the index.
+def _key_ranges(stored_keys: np.ndarray, offsets: np.ndarray, keys: np.ndarray):
+    positions = np.searchsorted(stored_keys, keys)
+    found = positions < len(stored_keys)
+    found[found] = stored_keys[positions[found]] == keys[found]
+    positions = positions[found]
+
+    return offsets[positions], offsets[positions + 1]
+
+
+# Number the rows of consecutive ranges, each on from the rows before it.
+def _range_rows(starts: np.ndarray, stops: np.ndarray):
+    lengths = stops - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+#------------------------------ Raw File Index -------------------------------#
+# Read the index of a text file by a key column, building it when the file has
+# changed size or modification time since it was indexed, or None when its
+# rows cannot be indexed by line.
+def _read_row_index(filename: str, key: str):
+    index_file = DATA_PATH + os.path.splitext(filename)[0] + "_Index.npz"
+    if os.path.exists(index_file):
+        with np.load(index_file) as f:
+            index = dict(f)
+        if index["state"].tolist() == _file_state(filename) and index["key"] == key:
+            return index
+
+    index = _build_row_index(filename, key)
+    if index is not None:
+        with open(index_file + ".tmp", "wb") as f:
+            np.savez(f, **index)
+        os.replace(index_file + ".tmp", index_file)
+    return index
+
+
+# Index the byte ranges of the runs of lines sharing each value of a key column
+# of a text file, parsing only the key column.
+@_traced
+def _build_row_index(filename: str, key: str, chunksize: int = CHUNK_SIZE):
+    state = _file_state(filename)
+    runs = []
+
+    _trace_read(DATA_PATH + filename)
+    with open(DATA_PATH + filename, "rb") as f:
+        names = f.readline().decode().rstrip("\r\n").split("\t")
+        position = f.tell()
+
+        for data in iter(lambda: b"".join(itertools.islice(f, chunksize)), b""):
+            values = pd.read_csv(io.BytesIO(data), delimiter="\t", header=None,
+                                 names=names, usecols=[key], dtype=_parse_dtypes())[key]
+
+            # Find where each line ends, which must be where each row does.
+            ends = position + np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10) + 1
+            if not data.endswith(b"\n"):
+                ends = np.append(ends, position + len(data))
+            if len(ends) != len(values):
+                return None
+            starts = np.append(position, ends[:-1])
+            position += len(data)
+
+            # Record the runs of lines with the same key value.
+            valid = values.notna().to_numpy()
+            values = values.fillna(-1).to_numpy(dtype=np.int64)
+            first = np.append(True, values[1:] != values[:-1])
+            last = np.append(first[1:], True)
+            runs.append(pd.DataFrame({
+                "Key": values[first], "Start": starts[first], "End": ends[last]
+            })[valid[first]])
+
+    # Join the runs continuing across chunks and group them by key value.
+    runs = pd.concat(runs, ignore_index=True) if runs else \
+        pd.DataFrame({"Key": [], "Start": [], "End": []}, dtype=np.int64)
+    joined = (runs["Key"] == runs["Key"].shift()) & (runs["Start"] == runs["End"].shift())
+    runs = runs.groupby((~joined).cumsum()).agg({"Key": "first", "Start": "first", "End": "last"})
+    runs = runs.sort_values("Key", kind="stable")
+    keys, counts = np.unique(runs["Key"].to_numpy(dtype=np.int64), return_counts=True)
+
+    return {
+        "state": np.array(state), "key": np.array(key), "keys": keys,
+        "offsets": np.append(0, np.cumsum(counts)),
+        "starts": runs["Start"].to_numpy(dtype=np.int64),
+        "ends": runs["End"].to_numpy(dtype=np.int64)
+    }
+
+
+# Read the rows of a text file with the given key values in chunks, seeking
+# straight to their byte ranges in the index and keeping them in file order.
+def _read_indexed_chunks(filename: str, index: dict, values, chunksize: int = CHUNK_SIZE,
+                         columns=None, where=None, workers: int = INGEST_WORKERS):
+    values = np.unique(np.asarray(values, dtype=np.int64))
+    runs = _range_rows(*_key_ranges(index["keys"], index["offsets"], values))
+    runs = runs[np.argsort(index["starts"][runs])]
+
+    _trace_read(DATA_PATH + filename)
+    with open(DATA_PATH + filename, "rb") as f:
+        names = f.readline().decode().rstrip("\r\n").split("\t")
+        pieces = _read_runs(f, index["starts"][runs], index["ends"][runs], chunksize)
+        yield from _map_ordered(functools.partial(
+            _parse_rows, names=names, columns=columns, where=where), pieces, workers)
+
+
+# Read byte ranges of whole lines of a file, joined into pieces of at least a
+# chunk of lines each.
+def _read_runs(f, starts: np.ndarray, ends: np.ndarray, chunksize: int):
+    piece, lines = [], 0
+    for start, end in zip(starts, ends):
+        f.seek(start)
+        piece.append(f.read(end - start))
+        lines += piece[-1].count(b"\n")
+        if lines >= chunksize:
+            yield b"".join(piece)
+            piece, lines = [], 0
+
+    if piece:
+        yield b"".join(piece)
+
+
+#------------------------------ Columnar Cache -------------------------------#
+# Check whether the columnar cache is enabled and can be written.
+def _columnar_cache_available():
+    return COLUMNAR_CACHE and pa is not None
+
+
+# Get the columnar cache filename for a text file.
+def _cache_filename(filename: str):
+    return os.path.splitext(filename)[0] + CACHE_EXTENSION
+
+
+# Check that a cache exists and is not older than its text file.
+def _is_fresh_cache(cache: str, filename: str):
+    filename = _text_filename(filename)
+    if not os.path.exists(cache):
+        return False
+    if not os.path.exists(filename):
+        return True
+    return os.path.getmtime(cache) >= os.path.getmtime(filename)
+
+
+# Append a chunk to the columnar cache, opening the writer on the first chunk.
+def _write_cache_chunk(writer, chunk: pd.DataFrame, cache: str):
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+    if writer is None:
+        # Columns that are entirely empty in the first chunk are stored as
+        # text, and categories as their values, as they differ between chunks.
+        schema = pa.schema([
+            field.with_type(pa.string()) if pa.types.is_null(field.type) else
+            field.with_type(field.type.value_type)
+            if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ], metadata=table.schema.metadata)
+        writer = pq.ParquetWriter(cache, schema,
+                                  compression=OUTPUT_COMPRESSION or "snappy")
+
+    writer.write_table(table.cast(writer.schema))
+    return writer
+
+
+# Convert known columns to their declared data types.
+def _apply_column_dtypes(dataframe: pd.DataFrame):
+    dtypes = {}
+    flags = {}
+
+    for col, dtype in COLUMN_DTYPES.items():
+        if col not in dataframe.columns or str(dataframe[col].dtype) == dtype:
+            continue
+
+        # Flags are recorded as Y/N in the raw data.
+        if dtype == "bool":
+            flags[col] = dataframe[col].isin(["Y", "True", True])
+        # Integers with missing values use the nullable integer type.
+        elif dtype.startswith("int") and dataframe[col].isna().any():
+            dtypes[col] = dtype.capitalize()
+        else:
+            dtypes[col] = dtype
+
+    if flags:
+        dataframe = dataframe.assign(**flags)
+    if dtypes:
+        dataframe = dataframe.astype(dtypes)
+    return dataframe
+
+
+# Convert columns with compact data types back to how they are written in the
+# text files: flags as Y/N, and integers with missing values as floats.
+def _text_column_values(dataframe: pd.DataFrame):
+    values = {}
+
+    for col, dtype in COLUMN_DTYPES.items():
+        if col not in dataframe.columns:
+            continue
+        if dtype == "bool" and dataframe[col].dtype == bool:
+            values[col] = np.where(dataframe[col], "Y", "N")
+        elif isinstance(dataframe[col].dtype, pd.api.extensions.ExtensionDtype) \
+                and dataframe[col].dtype.kind in "iu":
+            values[col] = dataframe[col].astype("float64")
+
+    return dataframe.assign(**values) if values else dataframe
+
+
+# Get the data types that can be applied while parsing text files. Integers
+# are parsed as the parser's own numbers and narrowed by _apply_column_dtypes,
+# as parsing them as nullable integers is several times slower.
+def _parse_dtypes():
+    return {
+        col: dtype for col, dtype in COLUMN_DTYPES.items()
+        if dtype != "bool" and not dtype.startswith("int")
+    }
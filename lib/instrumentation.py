@@ -0,0 +1,181 @@
+#---------------------------------- Imports ----------------------------------#
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+import tracemalloc
+import pandas as pd
+from lib.constants import DATA_PATH, TRACING
+
+
+#---------------------------------- Tracing ----------------------------------#
+# Trace being recorded, or None when tracing is disabled, and the entries of
+# the latest trace.
+_trace = None
+_entries = []
+
+# Steps currently running in each thread.
+_local = threading.local()
+
+
+# Start recording a trace of the traced pipeline steps, optionally measuring
+# their peak memory (which slows them down).
+def enable_tracing(memory: bool = False):
+    global _trace, _entries
+    _entries = []
+    _trace = {"start": time.perf_counter(), "entries": _entries,
+              "lock": threading.Lock(), "memory": memory,
+              "tracemalloc": memory and not tracemalloc.is_tracing()}
+
+    if _trace["tracemalloc"]:
+        tracemalloc.start()
+
+
+# Stop recording, returning the entries of the trace.
+def disable_tracing():
+    global _trace
+    if _trace is not None and _trace["tracemalloc"]:
+        tracemalloc.stop()
+    _trace = None
+
+    return _entries
+
+
+# Record each call of a function in the trace when tracing is enabled.
+def _traced(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _trace is None:
+            return func(*args, **kwargs)
+        return _trace_call(func, args, kwargs)
+
+    return wrapper
+
+
+# Call a function, recording its time, memory, rows and bytes in the trace.
+def _trace_call(func, args: tuple, kwargs: dict):
+    trace = _trace
+    stack = _stack()
+    entry = {
+        "name": func.__name__, "module": func.__module__,
+        "parent": stack[-1]["name"] if stack else None, "depth": len(stack),
+        "thread": threading.get_ident(),
+        "rows_in": _count_rows(list(args) + list(kwargs.values())),
+        "rows_out": None, "bytes_read": 0, "bytes_written": 0
+    }
+
+    # Measure memory from the current allocations, keeping the peak of the
+    # calling step before it is reset.
+    if trace["memory"]:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+        tracemalloc.reset_peak()
+        entry["_current"], entry["_peak"] = current, current
+
+    stack.append(entry)
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        end, cpu_end = time.perf_counter(), time.process_time()
+        stack.pop()
+
+        entry["start"] = start - trace["start"]
+        entry["wall_time"] = end - start
+        entry["cpu_time"] = cpu_end - cpu_start
+        entry["peak_memory_delta"] = None
+        if trace["memory"]:
+            peak = max(entry.pop("_peak"), tracemalloc.get_traced_memory()[1])
+            entry["peak_memory_delta"] = peak - entry.pop("_current")
+            if stack:
+                stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+            tracemalloc.reset_peak()
+
+        with trace["lock"]:
+            trace["entries"].append(entry)
+
+    entry["rows_out"] = _count_rows(result)
+    return result
+
+
+# Get the steps currently running in this thread.
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+# Get the steps running in this thread, to attribute work handed to another
+# thread to them.
+def _trace_context():
+    return list(_stack())
+
+
+# Run as part of the steps of another thread while in the context.
+@contextlib.contextmanager
+def _in_trace_context(context: list):
+    previous = _stack()
+    _local.stack = list(context)
+    try:
+        yield
+    finally:
+        _local.stack = previous
+
+
+# Count the rows of the dataframes in a value.
+def _count_rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        counts = [_count_rows(v) for v in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+# Count the bytes of a file read by the running step, which may also be running
+# in other threads.
+def _trace_read(filename: str):
+    trace = _trace
+    if trace is not None and _stack() and os.path.exists(filename):
+        with trace["lock"]:
+            _stack()[-1]["bytes_read"] += os.path.getsize(filename)
+
+
+# Count the bytes of a file written by the running step.
+def _trace_write(filename: str):
+    trace = _trace
+    if trace is not None and _stack() and os.path.exists(filename):
+        with trace["lock"]:
+            _stack()[-1]["bytes_written"] += os.path.getsize(filename)
+
+
+#------------------------------- Trace Output --------------------------------#
+# Write the entries of the latest trace as JSON.
+def write_trace(filename: str = "/Trace.json"):
+    with open(DATA_PATH + filename, "w") as f:
+        json.dump(sorted(_entries, key=lambda e: e["start"]), f, indent=2)
+
+
+# Write the trace in the Chrome trace event format, for viewing as a flame graph.
+def write_chrome_trace(filename: str = "/Trace_Chrome.json"):
+    events = [{
+        "name": entry["name"], "cat": entry["module"], "ph": "X",
+        "ts": entry["start"] * 1e6, "dur": entry["wall_time"] * 1e6,
+        "pid": os.getpid(), "tid": entry["thread"],
+        "args": {key: entry[key] for key in [
+            "cpu_time", "peak_memory_delta", "rows_in", "rows_out",
+            "bytes_read", "bytes_written"
+        ]}
+    } for entry in _entries]
+
+    with open(DATA_PATH + filename, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# Start tracing on import when it is enabled in the constants.
+if TRACING:
+    enable_tracing()
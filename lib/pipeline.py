@@ -0,0 +1,199 @@
+#---------------------------------- Imports ----------------------------------#
+import os
+import json
+import time
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import lib.constants as constants
+from lib.constants import DATA_PATH, PIPELINE_WORKERS, FEATURE_STORE_PATH
+from lib.clean_raw_data import clean_raw_data
+from lib.summarise_data import summarise_data
+from lib.feature_store import build_feature_store, summarise_debuts
+from lib.form_features import summarise_form
+from lib.reduce_summary import reduce_summary
+from lib.create_model import create_model
+from lib.train_model import train_model
+from lib.test_model import test_model
+from lib.helpers import _file_fingerprint, _file_state, _module_hash, \
+    _imported_modules
+from lib.instrumentation import _traced
+
+
+#------------------------------ Pipeline Runs --------------------------------#
+@_traced
+def run_pipeline(stages: list = None, force: bool = False, workers: int = PIPELINE_WORKERS):
+    manifest = _read_manifest()
+    pending = _required_stages(stages)
+    statuses = {}
+
+    # Run the stages whose dependencies are complete, a wave at a time.
+    while pending:
+        ready = [name for name in pending
+                 if all(dep in statuses for dep in PIPELINE_STAGES[name]["after"])]
+        keys = {name: _stage_key(name, manifest) for name in ready}
+        stale = [name for name in ready
+                 if force or not _is_current(name, keys[name], manifest)]
+
+        _run_stages(stale, workers)
+        for name in ready:
+            statuses[name] = "ran" if name in stale else "skipped"
+            pending.remove(name)
+
+        # Record the runs and the outputs they wrote.
+        for name in stale:
+            manifest["stages"][name] = {"key": keys[name], "run": time.time_ns()}
+            for filename in PIPELINE_STAGES[name]["outputs"]:
+                manifest["files"][filename] = _file_state(filename)
+        _write_manifest(manifest)
+
+    return statuses
+
+
+# Get the stages needed to run the given stages, in pipeline order.
+def _required_stages(stages: list):
+    required = set()
+    todo = list(PIPELINE_STAGES) if stages is None else list(stages)
+
+    while todo:
+        name = todo.pop()
+        if name not in PIPELINE_STAGES:
+            raise ValueError("{} is not a pipeline stage.".format(name))
+        if name not in required:
+            required.add(name)
+            todo += PIPELINE_STAGES[name]["after"]
+
+    return [name for name in PIPELINE_STAGES if name in required]
+
+
+# Run independent stages, in a pool of worker processes if there are several.
+def _run_stages(stages: list, workers: int):
+    if workers > 1 and len(stages) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(stages))) as executor:
+            futures = [executor.submit(PIPELINE_STAGES[name]["run"])
+                       for name in stages]
+            for future in futures:
+                future.result()
+    else:
+        for name in stages:
+            PIPELINE_STAGES[name]["run"]()
+
+
+#----------------------------- Stage Fingerprints ----------------------------#
+# Fingerprint a stage from its code, parameters, raw inputs and the runs of
+# the stages it depends on.
+def _stage_key(name: str, manifest: dict):
+    stage = PIPELINE_STAGES[name]
+    fingerprint = {
+        "code": {module: _module_hash(module)
+                 for module in _imported_modules(stage["modules"])},
+        "params": {param: repr(getattr(constants, param))
+                   for param in stage["params"]},
+        "inputs": {filename: _file_fingerprint(filename)
+                   for filename in stage["inputs"]},
+        "after": {dep: manifest["stages"].get(dep, {}).get("run")
+                  for dep in stage["after"]}
+    }
+    text = json.dumps(fingerprint, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# Check that a stage last ran with the same key and that its outputs have not
+# changed since they were written by the pipeline.
+def _is_current(name: str, key: str, manifest: dict):
+    stage = PIPELINE_STAGES[name]
+    if not stage["outputs"] or manifest["stages"].get(name, {}).get("key") != key:
+        return False
+
+    return all(
+        _file_state(filename) is not None and
+        manifest["files"].get(filename) == _file_state(filename)
+        for filename in stage["outputs"]
+    )
+
+
+#------------------------------ Pipeline Manifest ----------------------------#
+# Read the record of previous stage runs.
+def _read_manifest():
+    if not os.path.exists(DATA_PATH + "/Pipeline.json"):
+        return {"stages": {}, "files": {}}
+    with open(DATA_PATH + "/Pipeline.json") as f:
+        return json.load(f)
+
+
+# Write the record of stage runs, replacing the previous record in one step.
+def _write_manifest(manifest: dict):
+    filename = DATA_PATH + "/Pipeline.json"
+    with open(filename + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+
+#------------------------------- Stage Runners -------------------------------#
+# Train a new model and store it for testing.
+def _train_and_store_model():
+    model = train_model(create_model())
+    with open(DATA_PATH + "/Model.pkl", "wb") as f:
+        pickle.dump(model, f)
+
+
+# Test the stored model.
+def _test_stored_model():
+    with open(DATA_PATH + "/Model.pkl", "rb") as f:
+        test_model(pickle.load(f))
+
+
+#------------------------------ Stage Definitions ----------------------------#
+# Stages of the pipeline in order, with the stages they run after, their raw
+# inputs and outputs, the modules that run them, whose code is fingerprinted
+# with every module of the package they import, and the constants they depend
+# on. Stages without outputs always run.
+PIPELINE_STAGES = {
+    "clean_raw_data": {
+        "run": clean_raw_data, "after": [],
+        "inputs": ["/Matches.txt", "/Deliveries.txt"],
+        "outputs": ["/Batter_Summary.txt", "/Matches_Clean.txt",
+                    "/Deliveries_Clean.txt", "/Batter_Incidence.npz"],
+        "modules": ["lib.clean_raw_data"],
+        "params": ["MIN_INNINGS", "FORMATS", "HOME_NATION", "COLUMN_DTYPES"]
+    },
+    "summarise_data": {
+        "run": summarise_data, "after": ["clean_raw_data"], "inputs": [],
+        "outputs": ["/Batter_Summary.txt"],
+        "modules": ["lib.summarise_data"],
+        "params": ["FORMATS", "MILESTONES", "MILESTONE_LIMIT"]
+    },
+    "build_feature_store": {
+        "run": build_feature_store, "after": ["summarise_data"], "inputs": [],
+        "outputs": [FEATURE_STORE_PATH + "/columns.json"],
+        "modules": ["lib.feature_store"],
+        "params": ["FORMATS", "MILESTONES", "MILESTONE_LIMIT", "MATCH_DATE_FORMAT"]
+    },
+    "summarise_debuts": {
+        "run": summarise_debuts, "after": ["build_feature_store"], "inputs": [],
+        "outputs": ["/Batter_Debut_Summary.txt"],
+        "modules": ["lib.feature_store"], "params": []
+    },
+    "summarise_form": {
+        "run": summarise_form, "after": ["clean_raw_data"], "inputs": [],
+        "outputs": ["/Batter_Form.txt"],
+        "modules": ["lib.form_features"],
+        "params": ["FORMATS", "MILESTONES", "MATCH_DATE_FORMAT", "FORM_INNINGS",
+                   "FORM_HALF_LIFE", "FORM_SEASON_DAYS", "FORM_MILESTONES"]
+    },
+    "reduce_summary": {
+        "run": reduce_summary, "after": ["summarise_data"], "inputs": [],
+        "outputs": ["/Batter_Summary_Reduced.txt"],
+        "modules": ["lib.reduce_summary"], "params": []
+    },
+    "train_model": {
+        "run": _train_and_store_model, "after": ["reduce_summary"],
+        "inputs": [], "outputs": ["/Model.pkl"],
+        "modules": ["lib.create_model", "lib.train_model"],
+        "params": []
+    },
+    "test_model": {
+        "run": _test_stored_model, "after": ["train_model"], "inputs": [],
+        "outputs": [], "modules": ["lib.test_model"], "params": []
+    }
+}
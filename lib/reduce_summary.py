@@ -3,9 +3,11 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.feature_selection import RFE
 from lib.helpers import _write_dataframe_to_file, _read_dataframe, _create_test_train_split
+from lib.instrumentation import _traced
 
 
 #----------------------------- Summary Reduction -----------------------------#
+@_traced
 def reduce_summary():
     # Read summary data and remove  unnecessary columns.
     summary = _read_summary_data()
@@ -37,6 +39,7 @@ def reduce_summary():
 
 #---------------------------- Test and Training  -----------------------------#
 # Remove features of no importance.
+@_traced
 def remove_redundant_features(X_train):
     # Remove columns that have no variance (all 0 in this case).
     X_train_reduced = X_train.loc[:, (X_train != 0).any(axis=0)]
@@ -45,6 +48,7 @@ def remove_redundant_features(X_train):
 
 
 # Remove features that are highly correlated.
+@_traced
 def remove_correlated_features(X_train):
     # Remove predetermined set of highly correlated features.
     X_train_reduced = X_train.drop(columns=[
@@ -69,6 +73,7 @@ def remove_correlated_features(X_train):
 
 
 # Recursively reduce features.
+@_traced
 def recursive_feature_elimination(X_train, y_train):
     # Create a blank Random Forest Regressor.
     rfr = RandomForestRegressor(n_estimators=150, min_samples_split=5,
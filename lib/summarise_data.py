@@ -1,54 +1,319 @@
 #---------------------------------- Imports ----------------------------------#
+import os
+import json
+import inspect
+import hashlib
+import tempfile
+import functools
 import numpy as np
 import pandas as pd
-from lib.helpers import _write_dataframe_to_file, _read_dataframe
+from concurrent.futures import ProcessPoolExecutor
+import lib.constants as constants
+from lib.constants import DATA_PATH, FORMAT_LABELS, SUMMARY_WORKERS, \
+    CHUNKED_SUMMARY, MILESTONES, MILESTONE_LIMIT, FEATURE_CACHE, \
+    FEATURE_CACHE_PATH, DELIVERY_STORE
+from lib.helpers import _write_dataframe_to_file, _read_dataframe, \
+    _read_dataframe_partitions, _write_column_store, _read_column_store, \
+    _remove_column_store, _file_fingerprint, _module_hash, _imported_modules
+from lib.delivery_store import _read_match_deliveries, _read_delivery_partitions
+from lib.instrumentation import _traced
+
+
+#------------------------------ Summary Columns ------------------------------#
+# Columns of the clean data used by the summary.
+MATCH_COLUMNS = [
+    "Match Id", "Match Type Id", "Is Domestic", "Is International",
+    "Format Code"
+]
+DELIVERY_COLUMNS = [
+    "Match Id", "Innings", "Striker Id", "Striker", "Striker Hand",
+    "Bat Score", "Batter Out Id", "How Out", "Team Batting Id",
+    "Team Batting ResultId", "Cum Inning Balls", "Cum Inning Score",
+    "Cum Inning Wickets", "Inside Edge", "Outside Edge", "Play and Miss",
+    "Hit on Pads", "Hit on Body", "Contact Error", "Opportunity"
+]
+
+# Delivery columns marking a false shot.
+FALSE_SHOT_COLUMNS = [
+    "Inside Edge", "Outside Edge", "Play and Miss", "Hit on Pads",
+    "Hit on Body", "Contact Error", "Opportunity"
+]
+
+# Keys to summarise the domestic formats by.
+FORMAT_KEYS = ["Batter_ID", "Format"]
+
+# Labels for each way of getting out, including not out.
+HOW_OUT_LABELS = {
+    "NO": "Not_Out", "B": "Bowled", "C": "Caught", "LB": "LBW",
+    "HW": "Hit_Wicket", "S": "Stumped", "RO": "Run_Out",
+    "HB": "Handled_Ball", "HT": "Hit_Ball_Twice", "OF": "Obstructed_Field",
+    "TO": "Timed_Out"
+}
+
+# Labels for the number of runs scored from a ball.
+RUN_LABELS = {
+    0: "Dot", 1: "One", 2: "Two", 3: "Three", 4: "Four", 5: "Five", 6: "Six"
+}
+
+# Results of the batting team counted as wins.
+WIN_RESULT_IDS = [1, 2, 3, 4, 5, 15]
+
+# Keys of the innings table and how partial innings aggregates are merged.
+INNINGS_KEYS = ["Batter_ID", "Match_ID", "Innings"]
+INNINGS_MERGE = {
+    "Striker": "first", "Hand": "first", "Runs": "sum", "Balls": "sum",
+    "False_Shots": "sum", "Entering_Ball": "first", "Entering_Score": "first",
+    "Entering_Wicket": "first", "Team_ID": "first", "Result_ID": "first",
+    **{label: "sum" for label in RUN_LABELS.values()}
+}
 
 
 #---------------------------------- Summary ----------------------------------#
-def summarise_data():
-    # Read in clean match and delivery data.
-    match_data = _read_dataframe("/Matches_Clean.txt")
-    delivery_data = _read_dataframe("/Deliveries_Clean.txt", low_memory=False)
-    summary = _read_dataframe("/Batter_Summary.txt")
+@_traced
+def summarise_data(workers: int = SUMMARY_WORKERS, chunked: bool = CHUNKED_SUMMARY,
+                   cache: bool = FEATURE_CACHE):
+    # Read in the batters to summarise.
+    summary = _read_dataframe("/Batter_Summary.txt", columns=["Batter_ID"])
+
+    # Summarise the batters and write the summary to file.
+    summary = _summarise_batters(
+        summary, functools.partial(_read_innings_data, chunked), workers, cache)
+    _write_dataframe_to_file(summary, "/Batter_Summary.txt")
+
 
-    # Rename dataframe columns.
+# Summarise the batters from the innings table returned by read_innings.
+@_traced
+def _summarise_batters(summary: pd.DataFrame, read_innings, workers: int, cache: bool):
+    # Reuse the attributes and feature families cached for the same data and
+    # code, only summarising the innings when some must be rebuilt.
+    keys = _feature_keys(summary) if cache else {}
+    cached = _read_cached_features(keys)
+    stale = [name for name in ["attributes", *SUMMARY_FEATURES]
+             if name not in cached]
+
+    if stale:
+        innings_data = read_innings()
+        if "attributes" in stale:
+            cached["attributes"] = _summarise_batter_attributes(summary, innings_data)
+        names = [name for name in stale if name in SUMMARY_FEATURES]
+        ids = cached["attributes"][["Batter_ID"]]
+        if workers > 1:
+            built = _summarise_parallel(ids, innings_data, names, workers)
+        else:
+            built = [SUMMARY_FEATURES[name]["build"](ids, innings_data)
+                     for name in names]
+        cached.update(zip(names, built))
+        del innings_data
+
+        if cache:
+            _write_cached_features({name: cached[name] for name in stale}, keys)
+
+    # Join the features of every family into the summary.
+    return _assemble_summary(
+        cached["attributes"], [cached[name] for name in SUMMARY_FEATURES])
+
+
+#------------------------------ Innings Summary ------------------------------#
+# Read the clean data and summarise the deliveries of every innings.
+def _read_innings_data(chunked: bool):
+    # Read in clean match data.
+    match_data = _read_dataframe("/Matches_Clean.txt", columns=MATCH_COLUMNS)
     match_data.rename(columns={"Match Id": "Match_ID"}, inplace=True)
-    delivery_data.rename(
-        columns={"Striker Id": "Batter_ID", "Match Id": "Match_ID"}, inplace=True
+
+    # Summarise the deliveries of every innings in a single pass, streaming
+    # them in chunks of whole matches when they may not fit in memory.
+    if chunked:
+        return _summarise_chunked_innings(match_data)
+
+    if DELIVERY_STORE:
+        delivery_data = _read_match_deliveries(columns=DELIVERY_COLUMNS)
+    else:
+        delivery_data = _read_dataframe(
+            "/Deliveries_Clean.txt", low_memory=False, columns=DELIVERY_COLUMNS)
+    return _summarise_innings(_rename_delivery_columns(delivery_data), match_data)
+
+
+# Summarise the deliveries of each batter's innings into a single table.
+@_traced
+def _summarise_innings(delivery_data: pd.DataFrame, match_data: pd.DataFrame):
+    partials = [_partial_innings(delivery_data)]
+    return _complete_innings(_merge_partial_innings(partials), match_data)
+
+
+# Summarise the innings of the clean deliveries, read in chunks of whole matches.
+@_traced
+def _summarise_chunked_innings(match_data: pd.DataFrame):
+    if DELIVERY_STORE:
+        chunks = _read_delivery_partitions(columns=DELIVERY_COLUMNS)
+    else:
+        chunks = _read_dataframe_partitions(
+            "/Deliveries_Clean.txt", "Match Id", columns=DELIVERY_COLUMNS)
+
+    partials = [_partial_innings(_rename_delivery_columns(chunk)) for chunk in chunks]
+    return _complete_innings(_merge_partial_innings(partials), match_data)
+
+
+# Rename the delivery columns used as keys of the innings table.
+def _rename_delivery_columns(delivery_data: pd.DataFrame):
+    return delivery_data.rename(
+        columns={"Striker Id": "Batter_ID", "Match Id": "Match_ID"})
+
+
+# Aggregate a set of deliveries into partial innings, team totals and outs.
+def _partial_innings(delivery_data: pd.DataFrame):
+    # Flag false shots.
+    df = delivery_data.assign(
+        False_Shot=delivery_data[FALSE_SHOT_COLUMNS].any(axis=1))
+
+    # Aggregate the deliveries faced by each batter in each innings.
+    groups = df.groupby(INNINGS_KEYS, as_index=False)
+    innings = groups.agg(
+        Striker=("Striker", "first"),
+        Hand=("Striker Hand", "first"),
+        Runs=("Bat Score", "sum"),
+        Balls=("Bat Score", "size"),
+        False_Shots=("False_Shot", "sum"),
+        Entering_Ball=("Cum Inning Balls", "first"),
+        Entering_Score=("Cum Inning Score", "first"),
+        Entering_Wicket=("Cum Inning Wickets", "first"),
+        Team_ID=("Team Batting Id", "first"),
+        Result_ID=("Team Batting ResultId", "first")
+    )
+
+    # Count the balls of each run type in each innings.
+    innings[list(RUN_LABELS.values())] = _crosstab(
+        groups.ngroup().to_numpy(), groups.ngroups,
+        delivery_data["Bat Score"], list(RUN_LABELS)
+    )
+
+    # Extract the final score of each team in each innings.
+    team_total = delivery_data.groupby(
+        ["Match_ID", "Innings", "Team Batting Id"], as_index=False
+    )["Cum Inning Score"].last().rename(
+        {"Team Batting Id": "Team_ID", "Cum Inning Score": "Team_Total"}, axis=1
+    )
+
+    # Extract the dismissals of each batter in each innings.
+    outs = delivery_data[
+        (delivery_data["Batter Out Id"].notna()) &
+        (delivery_data["How Out"].notna())
+    ]
+    outs = outs.groupby(
+        ["Batter Out Id", "Match_ID", "Innings"], as_index=False
+    ).agg(Outs=("How Out", "size"), How_Out=("How Out", "first"))
+    outs.rename({"Batter Out Id": "Batter_ID", "How_Out": "How Out"},
+                axis=1, inplace=True)
+    outs["Batter_ID"] = outs["Batter_ID"].astype(innings["Batter_ID"].dtype)
+
+    return innings, team_total, outs
+
+
+# Merge partial innings aggregates, taken in delivery order, into totals.
+def _merge_partial_innings(partials: list):
+    innings, team_total, outs = [
+        pd.concat(parts, ignore_index=True) for parts in zip(*partials)
+    ]
+
+    innings = innings.groupby(INNINGS_KEYS, as_index=False).agg(INNINGS_MERGE)
+    team_total = team_total.groupby(
+        ["Match_ID", "Innings", "Team_ID"], as_index=False
+    )["Team_Total"].last()
+    outs = outs.groupby(INNINGS_KEYS, as_index=False).agg(
+        {"Outs": "sum", "How Out": "first"})
+
+    return innings, team_total, outs
+
+
+# Complete the innings table with team scores, dismissals and match details.
+def _complete_innings(partial: tuple, match_data: pd.DataFrame):
+    innings, team_total, outs = partial
+    innings = pd.merge(left=innings, right=team_total,
+                       on=["Match_ID", "Innings", "Team_ID"], how="left")
+
+    # Determine the highest individual score of each team in each innings.
+    innings["Team_High_Score"] = innings.groupby(
+        ["Match_ID", "Innings", "Team_ID"]
+    )["Runs"].transform("max")
+
+    # Add dismissals, including those of batters that did not face a ball.
+    innings = pd.merge(left=innings, right=outs, on=INNINGS_KEYS, how="outer")
+    counts = ["Runs", "Balls", "False_Shots", "Outs"] + list(RUN_LABELS.values())
+    innings[counts] = innings[counts].fillna(0).astype(int)
+
+    # Add the format and level of each match.
+    format_labels = dict(enumerate(FORMAT_LABELS, start=1))
+    match_df = match_data[["Match_ID", "Match Type Id"]].assign(
+        Format=match_data["Format Code"].map(format_labels),
+        Domestic=match_data["Is Domestic"] == 1,
+        International=match_data["Is International"] == 1
     )
+    innings = pd.merge(left=match_df, right=innings, on="Match_ID")
+
+    return innings
+
+
+# Count the occurrences of each category in each group in a single pass,
+# optionally weighting each occurrence.
+def _crosstab(codes: np.ndarray, groups: int, values: pd.Series, categories: list, weights: pd.Series = None):
+    columns = pd.Index(categories).get_indexer(values)
+    counted = (codes >= 0) & (columns >= 0)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[counted]
+
+    return np.bincount(
+        codes[counted] * len(categories) + columns[counted], weights=weights,
+        minlength=groups * len(categories)
+    ).reshape(groups, len(categories))
+
+
+# Extract the innings in which a batter faced at least one ball.
+def _batted_innings(df: pd.DataFrame):
+    return df[df["Balls"] > 0]
+
+
+#----------------------------- Parallel Summary ------------------------------#
+# Summarise independent feature families in a pool of worker processes.
+@_traced
+def _summarise_parallel(summary: pd.DataFrame, innings_data: pd.DataFrame, names: list, workers: int):
+    # Share the innings table with the workers through memory-mapped files,
+    # in a directory of this run's own so concurrent runs do not share it.
+    store = tempfile.mkdtemp(prefix="Innings_Store.", dir=DATA_PATH)
+
+    try:
+        _write_column_store(innings_data, store)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_summarise_stored_step,
+                                SUMMARY_FEATURES[name]["build"],
+                                summary[["Batter_ID"]], store)
+                for name in names
+            ]
+            return [future.result() for future in futures]
+    finally:
+        _remove_column_store(store)
+
+
+# Summarise a feature family from the stored innings table.
+def _summarise_stored_step(step, summary: pd.DataFrame, store: str):
+    innings_data = _read_column_store(store)
+    return step(summary, innings_data)
 
-    # Add information to the summary.
-    summary = _summarise_batter_attributes(summary, delivery_data)
-    summary = _summarise_batter_odi_average(summary, delivery_data, match_data)
-    summary = _summarise_batter_matches_played(
-        summary, delivery_data, match_data)
-    summary = _summarise_batter_outs(summary, delivery_data, match_data)
-    summary = _summarise_batter_runs(summary, delivery_data, match_data)
-    summary = _summarise_batter_milestones(summary, delivery_data, match_data)
-    summary = _summarise_batter_batting_position(
-        summary, delivery_data, match_data)
-    summary = _summarise_batter_style(summary, delivery_data, match_data)
-    summary = _summarise_batter_team_contribution(
-        summary, delivery_data, match_data)
-
-    # Write the summary to file.
-    _write_dataframe_to_file(summary, "/Batter_Summary.txt")
 
 #----------------------------- Summary Functions -----------------------------#
 # Summarise each batters attributes.
-def _summarise_batter_attributes(summary_data: pd.DataFrame, delivery_data: pd.DataFrame):
+@_traced
+def _summarise_batter_attributes(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
     # Extract important batter IDs.
     batter_ids = summary_data["Batter_ID"].tolist()
 
     # Get batter IDs and names.
-    df = delivery_data[
-        delivery_data["Batter_ID"].isin(batter_ids)
-    ][["Batter_ID", "Striker", "Striker Hand"]]
-    df.rename({"Striker": "Name", "Striker Hand": "Hand"},
-              axis=1, inplace=True)
+    df = _batted_innings(innings_data)
+    df = df[df["Batter_ID"].isin(batter_ids)][["Batter_ID", "Striker", "Hand"]]
+    df.rename({"Striker": "Name"}, axis=1, inplace=True)
 
-    # Drop duplicate data.
-    df = df.drop_duplicates(["Batter_ID"])
+    # Drop duplicate data, keeping the names and hands as plain text however
+    # the innings were aggregated.
+    df = df.drop_duplicates(["Batter_ID"]).astype({"Name": str, "Hand": str})
 
     # Join data with summary table.
     summary_data = pd.merge(
@@ -57,37 +322,25 @@ def _summarise_batter_attributes(summary_data: pd.DataFrame, delivery_data: pd.D
     return summary_data
 
 # Summarise each batters One-Day International average.
-def _summarise_batter_odi_average(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
+@_traced
+def _summarise_batter_odi_average(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
     # Extract batter IDs
     batter_ids = summary_data["Batter_ID"].tolist()
 
-    # Extract match IDs and match types for international games.
-    match_ids = match_data[
-        (match_data["Series"].str.contains("International")) &
-        (match_data["Match Type Id"] == 1)
-    ]["Match_ID"].tolist()
-
-    # Extract deliveries to relevant batters.
-    runs_df = delivery_data[
-        (delivery_data["Batter_ID"].isin(batter_ids)) &
-        (delivery_data["Match_ID"].isin(match_ids))
-    ][["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
+    # Extract innings of relevant batters in international One-Day games.
+    df = innings_data[
+        (innings_data["International"]) &
+        (innings_data["Match Type Id"] == 1) &
+        (innings_data["Batter_ID"].isin(batter_ids))
+    ]
 
-    # Count the total number of runs for wach batter in ODI.
-    runs_df = runs_df.groupby(
+    # Count the total number of runs and outs for each batter in ODI.
+    runs_df = _batted_innings(df).groupby(
         "Batter_ID", as_index=False
-    )["Bat Score"].sum().rename({"Bat Score": "Total_Runs"}, axis=1)
-
-    # Extract the wickets of relevant batters.
-    wickets_df = delivery_data[
-        (delivery_data["Batter Out Id"].isin(batter_ids)) &
-        (delivery_data["Match_ID"].isin(match_ids))
-    ][["Batter_ID", "Match_ID", "Innings", "Batter Out Id"]]
-
-    # Count the total number of outs for each batter.
-    wickets_df = wickets_df.groupby(
-        "Batter Out Id", as_index=False
-    ).size().rename({"Batter Out Id": "Batter_ID", "size": "Out_Count"}, axis=1)
+    )["Runs"].sum().rename({"Runs": "Total_Runs"}, axis=1)
+    wickets_df = df[df["Outs"] > 0].groupby(
+        "Batter_ID", as_index=False
+    )["Outs"].sum().rename({"Outs": "Out_Count"}, axis=1)
 
     # Determine the batting average of each batter.
     df = pd.merge(left=runs_df, right=wickets_df, on="Batter_ID", how="outer")
@@ -99,1025 +352,546 @@ def _summarise_batter_odi_average(summary_data: pd.DataFrame, delivery_data: pd.
     df.rename({
         "Total_Runs": "International_One_Day_Batting_Average"
     }, axis=1, inplace=True)
-    df.drop(columns=["Out_Count"], inplace=True)
 
-    # Join data into summary.
-    summary_data = pd.merge(
-        left=summary_data, right=df, on="Batter_ID", how="left"
-    )
-    return summary_data
+    return df.set_index("Batter_ID")[["International_One_Day_Batting_Average"]]
 
 
 # Summarise the matches played by each batter.
-def _summarise_batter_matches_played(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs.
-    batter_ids = summary_data["Batter_ID"].tolist()
+@_traced
+def _summarise_batter_matches_played(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, _batted_innings(innings_data))
+
+    # Summarise matches in each format, counting none where none were played.
+    features = _spread_format_features(_summarise_matches(df))
+    features = features.reindex(summary_data["Batter_ID"]).fillna(0)
+    features = features.astype({
+        col: int for col in features.columns if col.endswith("_Count")
+    })
 
-    # Extract match IDs and match types for domestic games.
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
+    # Summarise the percentage of each format played by a batter.
+    return _summarise_formats(features)
 
-    # Extract deliveries to relevant batters and add match details.
-    df = delivery_data[
-        delivery_data["Batter_ID"].isin(batter_ids)
-    ][["Batter_ID", "Match_ID", "Team Batting ResultId", "Innings"]]
-    df = pd.merge(left=match_df, right=df, on="Match_ID")
 
-    # Summarise One-Day matches.
-    games_df = df[df["Match Type Id"] == 1]
-    summary_data = _summarise_matches(games_df, summary_data, "One_Day")
+# Summarise the wickets of each batter.
+@_traced
+def _summarise_batter_outs(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, innings_data)
 
-    # Summarise Test matches.
-    games_df = df[df["Match Type Id"].isin([4, 5])]
-    summary_data = _summarise_matches(games_df, summary_data, "Test")
+    # Summarise wickets in each format.
+    return _spread_format_features(_summarise_wickets(df))
 
-    # Summarise T20 matches.
-    games_df = df[df["Match Type Id"] == 7]
-    summary_data = _summarise_matches(games_df, summary_data, "T20")
 
-    # Summarise the percentage of each format played by a batter.
-    summary_data = _summarise_formats(summary_data)
+# Summarise the runs of each batter.
+@_traced
+def _summarise_batter_runs(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, innings_data)
 
-    return summary_data
+    # Summarise runs in each format.
+    features = pd.concat([
+        _summarise_run_spread(df),
+        _summarise_average(df),
+        _summarise_high_score(df)
+    ], axis=1)
+    return _spread_format_features(features)
 
 
-# Summarise the wickets of each batter.
-def _summarise_batter_outs(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs
-    batter_ids = summary_data["Batter_ID"].tolist()
+# Summarise the milestones achieved by each batter (e.g., 50, 100, etc.).
+@_traced
+def _summarise_batter_milestones(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, _batted_innings(innings_data))
 
-    # Extract match IDs and match types for domestic games
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
+    # Summarise milestones in each format.
+    return _spread_format_features(_summarise_milestones(df))
 
-    # Extract deliveries to relevant batters and add match details
-    df = delivery_data[
-        (delivery_data["Batter Out Id"].isin(batter_ids)) &
-        (~delivery_data["How Out"].isna())
-    ][["Batter Out Id", "Match_ID", "Innings", "How Out"]]
-    df = df.rename({"Batter Out Id": "Batter_ID"}, axis=1)
-    df = pd.merge(left=match_df, right=df, on="Match_ID")
 
-    # Summarise One-Day wickets.
-    games_df = df[df["Match Type Id"] == 1]
-    summary_data = _summarise_wickets(games_df, summary_data, "One_Day")
+# Summarise each batters batting position.
+@_traced
+def _summarise_batter_batting_position(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, _batted_innings(innings_data))
 
-    # Summarise Test wickets.
-    games_df = df[df["Match Type Id"].isin([4, 5])]
-    summary_data = _summarise_wickets(games_df, summary_data, "Test")
+    # Summarise batting position in each format.
+    return _spread_format_features(_summarise_batting_position(df))
 
-    # Summarise T20 wickets.
-    games_df = df[df["Match Type Id"] == 7]
-    summary_data = _summarise_wickets(games_df, summary_data, "T20")
 
-    return summary_data
+# Summarise the batting style of each batter.
+@_traced
+def _summarise_batter_style(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, _batted_innings(innings_data))
 
+    # Summarise batting style in each format.
+    features = pd.concat([
+        _summarise_balls_per_innings(df),
+        _summarise_false_shots(df),
+        _summarise_strike_rate(df)
+    ], axis=1)
+    return _spread_format_features(features)
 
-# Summarise the runs of each batter.
-def _summarise_batter_runs(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs.
-    batter_ids = summary_data["Batter_ID"].tolist()
 
-    # Extract match IDs and match types for domestic games.
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
-
-    # Extract deliveries to relevant batters and add match details.
-    df1 = delivery_data[
-        delivery_data["Batter_ID"].isin(batter_ids)
-    ][["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
-    df1 = pd.merge(left=match_df, right=df1, on="Match_ID")
-
-    df2 = delivery_data[
-        delivery_data["Batter Out Id"].isin(batter_ids)
-    ][["Batter Out Id", "Match_ID", "Innings", "How Out"]]
-    df2 = pd.merge(left=match_df, right=df2, on="Match_ID")
-
-    # Summarise One-Day runs.
-    games_df1 = df1[df1["Match Type Id"] == 1]
-    games_df2 = df2[df2["Match Type Id"] == 1]
-    summary_data = _summarise_run_spread(games_df1, summary_data, "One_Day")
-    summary_data = _summarise_average(
-        games_df1, games_df2, summary_data, "One_Day")
-    summary_data = _summarise_high_score(games_df1, summary_data, "One_Day")
-
-    # Summarise Test runs.
-    games_df1 = df1[df1["Match Type Id"].isin([4, 5])]
-    games_df2 = df2[df2["Match Type Id"].isin([4, 5])]
-    summary_data = _summarise_run_spread(games_df1, summary_data, "Test")
-    summary_data = _summarise_average(
-        games_df1, games_df2, summary_data, "Test")
-    summary_data = _summarise_high_score(games_df1, summary_data, "Test")
-
-    # Summarise T20 runs.
-    games_df1 = df1[df1["Match Type Id"] == 7]
-    games_df2 = df2[df2["Match Type Id"] == 7]
-    summary_data = _summarise_run_spread(games_df1, summary_data, "T20")
-    summary_data = _summarise_average(
-        games_df1, games_df2, summary_data, "T20")
-    summary_data = _summarise_high_score(games_df1, summary_data, "T20")
-    return summary_data
+# Summarise how each batter contributed to their teams.
+@_traced
+def _summarise_batter_team_contribution(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
+    # Extract domestic innings of relevant batters.
+    df = _domestic_innings(summary_data, _batted_innings(innings_data))
 
+    # Summarise team contribution in each format.
+    features = pd.concat([
+        _summarise_team_run_contribution(df),
+        _summarise_team_highest_scorer(df)
+    ], axis=1)
+    return _spread_format_features(features)
 
-# Summarise the milestones achieved by each batter (e.g., 50, 100, etc.).
-def _summarise_batter_milestones(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs.
+
+# Extract the domestic innings of the batters in the summary.
+def _domestic_innings(summary_data: pd.DataFrame, innings_data: pd.DataFrame):
     batter_ids = summary_data["Batter_ID"].tolist()
+    return innings_data[
+        (innings_data["Domestic"]) &
+        (innings_data["Batter_ID"].isin(batter_ids))
+    ]
 
-    # Extract match IDs and match types for domestic games.
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
-
-    # Extract deliveries to relevant batters and add match details.
-    df = delivery_data[
-        (delivery_data["Batter_ID"].isin(batter_ids))
-    ][["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
-    df = pd.merge(left=match_df, right=df, on="Match_ID")
-
-    # Summarise One-Day milestones.
-    games_df = df[
-        df["Match Type Id"] == 1
-    ][["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
-    summary_data = _summarise_milestones(games_df, summary_data, "One_Day")
-
-    # Summarise Test milestones.
-    games_df = df[
-        df["Match Type Id"].isin([4, 5])
-    ][["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
-    summary_data = _summarise_milestones(games_df, summary_data, "Test")
-
-    # Summarise T20 milestones.
-    games_df = df[
-        df["Match Type Id"] == 7
-    ][["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
-    summary_data = _summarise_milestones(games_df, summary_data, "T20")
-    return summary_data
 
+# Spread features of each batter and format into columns of each batter.
+def _spread_format_features(features: pd.DataFrame):
+    # Spread the formats into columns, grouping the columns by format.
+    names = features.columns.tolist()
+    features = features.unstack("Format").swaplevel(axis=1).reindex(
+        columns=pd.MultiIndex.from_product([FORMAT_LABELS, names])
+    )
+    features.columns = _format_columns(names)
 
-# Summarise each batters batting position.
-def _summarise_batter_batting_position(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs.
-    batter_ids = summary_data["Batter_ID"].tolist()
+    return features
 
-    # Extract match IDs and match types for domestic games.
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
 
-    # Extract deliveries to relevant batters and add match details.
-    df = delivery_data[(delivery_data["Batter_ID"].isin(batter_ids))][
-        ["Batter_ID", "Match_ID", "Innings",
-         "Cum Inning Balls", "Cum Inning Score", "Cum Inning Wickets"]
+# Get the summary columns of features in every domestic format.
+def _format_columns(names: list):
+    return ["Domestic_{}_{}".format(format_label, name)
+            for format_label in FORMAT_LABELS for name in names]
+
+
+#----------------------------- Summary Assembly ------------------------------#
+# Assemble the summary from the batter attributes and the features of each
+# family, aligned on the batters in a single concatenation.
+def _assemble_summary(summary: pd.DataFrame, features: list):
+    summary = summary.set_index("Batter_ID")
+    frames = [summary] + [
+        _align_feature(name, feature, summary.index)
+        for name, feature in zip(SUMMARY_FEATURES, features)
     ]
-    df = pd.merge(left=match_df, right=df, on="Match_ID")
 
-    # Summarise One-Day batting position.
-    games_df = df[df["Match Type Id"] == 1]
-    summary_data = _summarise_batting_position(
-        games_df, summary_data, "One_Day")
+    return pd.concat(frames, axis=1).reset_index()
+
+
+# Check the columns of a feature family and align it to the summary batters,
+# filling missing values as declared.
+def _align_feature(name: str, feature: pd.DataFrame, batter_ids: pd.Index):
+    spec = SUMMARY_FEATURES[name]
+    if feature.columns.tolist() != spec["columns"]:
+        t = "The {} features have columns {} instead of {}."
+        raise ValueError(t.format(name, feature.columns.tolist(), spec["columns"]))
+    if not feature.index.is_unique:
+        raise ValueError("The {} features have duplicate batters.".format(name))
+
+    feature = feature.reindex(batter_ids)
+    if spec["fill"]:
+        feature = feature.fillna(spec["fill"]).astype(spec["dtypes"])
+    return feature
+
+
+#------------------------------- Feature Cache -------------------------------#
+# Fingerprint the batter attributes and each feature family from the clean
+# data, the batters, the parameters they depend on, and the code of this module
+# and every module of the package it imports. The pandas version is included
+# as the frames are cached as pickles.
+def _feature_keys(summary: pd.DataFrame):
+    shared = {
+        "pandas": pd.__version__,
+        "data": [_file_fingerprint(filename) for filename in
+                 ["/Matches_Clean.txt", "/Deliveries_Clean.txt"]],
+        "batters": hashlib.sha256(
+            summary["Batter_ID"].to_numpy().tobytes()).hexdigest(),
+        "code": {module: _module_hash(module)
+                 for module in _imported_modules(["lib.summarise_data"])},
+        "params": {param: repr(getattr(constants, param))
+                   for param in FEATURE_PARAMS}
+    }
+
+    keys = {"attributes": _feature_key(shared, "attributes")}
+    for name, spec in SUMMARY_FEATURES.items():
+        keys[name] = _feature_key(shared, name, spec["params"], spec["columns"])
+    return keys
+
+
+# Fingerprint a cached frame from the shared fingerprint and its own name,
+# constants and columns.
+def _feature_key(shared: dict, name: str, params: list = (), columns: list = ()):
+    fingerprint = dict(shared, **{
+        "name": name,
+        "own_params": {param: repr(getattr(constants, param)) for param in params},
+        "columns": list(columns)
+    })
+    text = json.dumps(fingerprint, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
 
-    # Summarise Test batting position.
-    games_df = df[df["Match Type Id"].isin([4, 5])]
-    summary_data = _summarise_batting_position(games_df, summary_data, "Test")
 
-    # Summarise T20 batting position.
-    games_df = df[df["Match Type Id"] == 7]
-    summary_data = _summarise_batting_position(games_df, summary_data, "T20")
-    return summary_data
+# Hash the source code of a function.
+def _source_hash(func):
+    return hashlib.sha256(inspect.getsource(func).encode()).hexdigest()
 
 
-# Summarise the batting style of each batter.
-def _summarise_batter_style(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs.
-    batter_ids = summary_data["Batter_ID"].tolist()
+# Read the cached frames that are still current.
+@_traced
+def _read_cached_features(keys: dict):
+    manifest = _read_feature_manifest()
 
-    # Extract match IDs and match types for domestic games.
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
-
-    # Extract deliveries to relevant batters and add match details.
-    df = delivery_data[(delivery_data["Batter_ID"].isin(batter_ids))][[
-        "Batter_ID", "Match_ID", "Innings", "Bat Score",
-        "Inside Edge", "Outside Edge", "Play and Miss", "Hit on Pads",
-        "Hit on Body", "Contact Error", "Opportunity"
-    ]]
-    df = pd.merge(left=match_df, right=df, on="Match_ID")
-
-    # Summarise One-Day batting style.
-    games_df = df[df["Match Type Id"] == 1]
-    summary_data = _summarise_balls_per_innings(
-        games_df, summary_data, "One_Day")
-    summary_data = _summarise_false_shots(games_df, summary_data, "One_Day")
-    summary_data = _summarise_strike_rate(games_df, summary_data, "One_Day")
-
-    # Summarise Test batting style.
-    games_df = df[df["Match Type Id"].isin([4, 5])]
-    summary_data = _summarise_balls_per_innings(games_df, summary_data, "Test")
-    summary_data = _summarise_false_shots(games_df, summary_data, "Test")
-    summary_data = _summarise_strike_rate(games_df, summary_data, "Test")
-
-    # Summarise T20 batting style.
-    games_df = df[df["Match Type Id"] == 7]
-    summary_data = _summarise_balls_per_innings(games_df, summary_data, "T20")
-    summary_data = _summarise_false_shots(games_df, summary_data, "T20")
-    summary_data = _summarise_strike_rate(games_df, summary_data, "T20")
-    return summary_data
+    return {
+        name: pd.read_pickle(_feature_filename(name))
+        for name, key in keys.items()
+        if manifest.get(name) == key and os.path.exists(_feature_filename(name))
+    }
 
 
-# Summarise how each batter contributed to their teams.
-def _summarise_batter_team_contribution(summary_data: pd.DataFrame, delivery_data: pd.DataFrame, match_data: pd.DataFrame):
-    # Extract batter IDs.
-    batter_ids = summary_data["Batter_ID"].tolist()
+# Cache rebuilt frames, recording their keys once they are written.
+@_traced
+def _write_cached_features(features: dict, keys: dict):
+    os.makedirs(DATA_PATH + FEATURE_CACHE_PATH, exist_ok=True)
+    manifest = _read_feature_manifest()
 
-    # Extract match IDs and match types for domestic games.
-    match_df = match_data[
-        match_data["Series"].str.contains("Domestic")
-    ][["Match_ID", "Match Type Id"]]
+    for name, feature in features.items():
+        feature.to_pickle(_feature_filename(name) + ".tmp")
+        os.replace(_feature_filename(name) + ".tmp", _feature_filename(name))
+        manifest[name] = keys[name]
 
-    # Extract deliveries to relevant batters and add match details.
-    df = delivery_data[
-        ["Batter_ID", "Match_ID", "Innings",
-         "Bat Score", "Team Batting Id", "Cum Inning Score"]
-    ]
-    df = pd.merge(left=match_df, right=df, on="Match_ID")
+    filename = DATA_PATH + FEATURE_CACHE_PATH + "/Features.json"
+    with open(filename + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(filename + ".tmp", filename)
 
-    # Summarise One-Day team contribution.
-    games_df = df[df["Match Type Id"] == 1]
-    summary_data = _summarise_team_run_contribution(
-        games_df, summary_data, "One_Day", batter_ids
-    )
-    summary_data = _summarise_team_highest_scorer(
-        games_df, summary_data, "One_Day", batter_ids
-    )
 
-    # Summarise Test team contribution.
-    games_df = df[df["Match Type Id"].isin([4, 5])]
-    summary_data = _summarise_team_run_contribution(
-        games_df, summary_data, "Test", batter_ids
-    )
-    summary_data = _summarise_team_highest_scorer(
-        games_df, summary_data, "Test", batter_ids
-    )
+# Read the keys of the cached frames.
+def _read_feature_manifest():
+    filename = DATA_PATH + FEATURE_CACHE_PATH + "/Features.json"
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        return json.load(f)
 
-    # Summarise T20 team contribution.
-    games_df = df[df["Match Type Id"] == 7]
-    summary_data = _summarise_team_run_contribution(
-        games_df, summary_data, "T20", batter_ids
-    )
-    summary_data = _summarise_team_highest_scorer(
-        games_df, summary_data, "T20", batter_ids
-    )
-    return summary_data
+
+# Get the cache filename of a frame.
+def _feature_filename(name: str):
+    return DATA_PATH + FEATURE_CACHE_PATH + "/" + name + ".pkl"
 
 
 #----------------------------- Helper Functions ------------------------------#
 # Function to summarise a players matches.
-def _summarise_matches(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels
-    gamesLabel = "Domestic_{}_Match_Count".format(format_label)
-    inningsLabel = "Domestic_{}_Innings_Count".format(format_label)
-    winLabel = "Domestic_{}_Win_Rate".format(format_label)
-
+@_traced
+def _summarise_matches(df: pd.DataFrame):
     # Count the number of games and innings played.
-    games_df = df.copy()
-    games_df["Innings"] = (
-        df["Match_ID"].astype(str) + df["Innings"].astype(str)
-    ).astype(int)
-    games_df = games_df.groupby(
-        ["Batter_ID"], as_index=False
-    ).agg({"Innings": "nunique", "Match_ID": "nunique"})
-    games_df.rename(
-        columns={"Match_ID": gamesLabel, "Innings": inningsLabel}, inplace=True
+    games_df = df.groupby(FORMAT_KEYS).agg(
+        Innings_Count=("Innings", "size"), Match_Count=("Match_ID", "nunique")
     )
 
     # Count the number of wins.
-    wins_df = df[df["Team Batting ResultId"].isin([1, 2, 3, 4, 5, 15])]
-    wins_df = wins_df.groupby(
-        ["Batter_ID"], as_index=False
-    ).agg({"Match_ID": "nunique"})
-    wins_df.rename(columns={"Match_ID": winLabel}, inplace=True)
-
-    # Add wins to game dataframe and determine win-rate.
-    games_df = pd.merge(left=games_df, right=wins_df,
-                        on="Batter_ID", how="left")
-    games_df[winLabel].fillna(0, inplace=True)
-    games_df[winLabel] = np.where(
-        games_df[gamesLabel] < 1,
-        games_df[gamesLabel],
-        games_df[winLabel]/games_df[gamesLabel]
-    )
+    wins_df = df[df["Result_ID"].isin(WIN_RESULT_IDS)]
+    games_df["Win_Rate"] = wins_df.groupby(FORMAT_KEYS)["Match_ID"].nunique()
 
-    # Insert data into summary dataframe.
-    summary = pd.merge(left=summary, right=games_df,
-                       on="Batter_ID", how="left")
-    summary.fillna({gamesLabel: 0, inningsLabel: 0, winLabel: 0}, inplace=True)
-    summary = summary.astype(
-        {gamesLabel: int, inningsLabel: int, winLabel: float}
+    # Determine win-rate.
+    games_df["Win_Rate"] = games_df["Win_Rate"].fillna(0)
+    games_df["Win_Rate"] = np.where(
+        games_df["Match_Count"] < 1,
+        games_df["Match_Count"],
+        games_df["Win_Rate"]/games_df["Match_Count"]
     )
 
-    return summary
+    return games_df
 
 
 # Function to summarise the percentage of each format played by a batter.
+@_traced
 def _summarise_formats(summary: pd.DataFrame):
-    # Format labels.
-    one_day_match_count_label = "Domestic_One_Day_Match_Count"
-    one_day_match_percent_label = "Domestic_One_Day_Match_Percent"
-    one_day_innings_count_label = "Domestic_One_Day_Innings_Count"
-    one_day_innings_percent_label = "Domestic_One_Day_Innings_Percent"
-    test_match_count_label = "Domestic_Test_Match_Count"
-    test_match_percent_label = "Domestic_Test_Match_Percent"
-    test_innings_count_label = "Domestic_Test_Innings_Count"
-    test_innings_percent_label = "Domestic_Test_Innings_Percent"
-    t20_match_count_label = "Domestic_T20_Match_Count"
-    t20_match_percent_label = "Domestic_T20_Match_Percent"
-    t20_innings_count_label = "Domestic_T20_Innings_Count"
-    t20_innings_percent_label = "Domestic_T20_Innings_Percent"
-
-    # Extract necessary information.
-    matches = summary[[
-        "Batter_ID",
-        one_day_match_count_label,
-        test_match_count_label,
-        t20_match_count_label
-    ]].rename({
-        one_day_match_count_label: one_day_match_percent_label,
-        test_match_count_label: test_match_percent_label,
-        t20_match_count_label: t20_match_percent_label
-    }, axis=1)
-    innings = summary[[
-        "Batter_ID",
-        one_day_innings_count_label,
-        test_innings_count_label,
-        t20_innings_count_label
-    ]].rename({
-        one_day_innings_count_label: one_day_innings_percent_label,
-        test_innings_count_label: test_innings_percent_label,
-        t20_innings_count_label: t20_innings_percent_label
-    }, axis=1)
-
-    # Determine the total number of games and innings for each batter.
-    matches["Total_Games"] = (
-        matches[one_day_match_percent_label] +
-        matches[test_match_percent_label] +
-        matches[t20_match_percent_label]
-    )
-    innings["Total_Innings"] = (
-        innings[one_day_innings_percent_label] +
-        innings[test_innings_percent_label] +
-        innings[t20_innings_percent_label]
-    )
-
-    # Determine percentages.
-    matches[one_day_match_percent_label] = np.where(
-        matches["Total_Games"] < 1,
-        matches["Total_Games"],
-        matches[one_day_match_percent_label]/matches["Total_Games"]
-    )
-    matches[test_match_percent_label] = np.where(
-        matches["Total_Games"] < 1,
-        matches["Total_Games"],
-        matches[test_match_percent_label]/matches["Total_Games"]
-    )
-    matches[t20_match_percent_label] = np.where(
-        matches["Total_Games"] < 1,
-        matches["Total_Games"],
-        matches[t20_match_percent_label]/matches["Total_Games"]
-    )
-    matches.drop(columns=["Total_Games"], inplace=True)
-
-    innings[one_day_innings_percent_label] = np.where(
-        innings["Total_Innings"] < 1,
-        innings["Total_Innings"],
-        innings[one_day_innings_percent_label]/innings["Total_Innings"]
-    )
-    innings[test_innings_percent_label] = np.where(
-        innings["Total_Innings"] < 1,
-        innings["Total_Innings"],
-        innings[test_innings_percent_label]/innings["Total_Innings"]
-    )
-    innings[t20_innings_percent_label] = np.where(
-        innings["Total_Innings"] < 1,
-        innings["Total_Innings"],
-        innings[t20_innings_percent_label]/innings["Total_Innings"]
-    )
-    innings.drop(columns=["Total_Innings"], inplace=True)
+    for count in ["Match", "Innings"]:
+        # Format labels.
+        count_labels = ["Domestic_{}_{}_Count".format(format_label, count)
+                        for format_label in FORMAT_LABELS]
+        percent_labels = ["Domestic_{}_{}_Percent".format(format_label, count)
+                          for format_label in FORMAT_LABELS]
+
+        # Determine the total number of games or innings for each batter.
+        total = summary[count_labels].sum(axis=1)
+
+        # Determine percentages.
+        for count_label, percent_label in zip(count_labels, percent_labels):
+            summary[percent_label] = np.where(
+                total < 1,
+                total,
+                summary[count_label]/total
+            )
 
-    # Merge data into summary.
-    summary = pd.merge(left=summary, right=matches, on="Batter_ID", how="left")
-    summary = pd.merge(left=summary, right=innings, on="Batter_ID", how="left")
     return summary
 
 
 # Function to summarise each batters wickets.
-def _summarise_wickets(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels.
-    not_out_label = "Domestic_{}_Not_Out_Percent".format(format_label)
-    bowled_label = "Domestic_{}_Bowled_Percent".format(format_label)
-    caught_label = "Domestic_{}_Caught_Percent".format(format_label)
-    lbw_label = "Domestic_{}_LBW_Percent".format(format_label)
-    hit_wicket_label = "Domestic_{}_Hit_Wicket_Percent".format(format_label)
-    stumped_label = "Domestic_{}_Stumped_Percent".format(format_label)
-    run_out_label = "Domestic_{}_Run_Out_Percent".format(format_label)
-    handled_ball_label = "Domestic_{}_Handled_Ball_Percent".format(
-        format_label)
-    hit_ball_twice_label = "Domestic_{}_Hit_Ball_Twice_Percent".format(
-        format_label)
-    obstructed_field_label = "Domestic_{}_Obstructed_Field_Percent".format(
-        format_label)
-    timed_out_label = "Domestic_{}_Timed_Out_Percent".format(format_label)
-
-    innings_label = "Domestic_{}_Innings_Count".format(format_label)
-
-    # Determine how often a batter gets out in each way.
-    how_out = df.groupby(
-        ["Batter_ID", "How Out"]
-    ).size().reset_index().rename({0: "Out_Percent"}, axis=1)
-    how_out = pd.merge(
-        left=summary[["Batter_ID", innings_label]],
-        right=how_out,
-        on="Batter_ID",
-        how="left"
-    )
-
-    # Determine how often a batter is not out.
-    not_out = how_out.groupby(
-        "Batter_ID", as_index=False
-    ).agg({"Out_Percent": "sum"})
-    not_out = pd.merge(
-        left=summary[["Batter_ID", innings_label]],
-        right=not_out,
-        on="Batter_ID",
-        how="left"
-    )
-    not_out["Out_Percent"] = np.where(
-        not_out[innings_label] < 1,
-        not_out[innings_label],
-        not_out[innings_label] - not_out["Out_Percent"]
-    )
-    not_out = not_out[not_out["Out_Percent"] > 0]
-    not_out["How Out"] = "NO"
-    how_out = how_out.append(not_out, ignore_index=True)
+@_traced
+def _summarise_wickets(df: pd.DataFrame):
+    # Count the innings and the number of times a batter gets out in each way.
+    groups = df.groupby(FORMAT_KEYS)
+    codes = groups.ngroup().to_numpy()
+    innings = np.bincount(codes[(df["Balls"] > 0).to_numpy()],
+                          minlength=groups.ngroups)[:, np.newaxis]
+    how_out = _crosstab(codes, groups.ngroups, df["How Out"],
+                        list(HOW_OUT_LABELS), weights=df["Outs"])
+
+    # Determine how often a batter is not out from all of their outs.
+    outs = np.bincount(codes, weights=df["Outs"].where(df["How Out"].notna(), 0),
+                       minlength=groups.ngroups)[:, np.newaxis]
+    how_out[:, [list(HOW_OUT_LABELS).index("NO")]] = np.clip(innings - outs, 0, None)
 
     # Determine percentage of each wicket occurring.
-    how_out["Out_Percent"] = np.where(
-        how_out[innings_label] < 1,
-        how_out[innings_label],
-        how_out["Out_Percent"]/how_out[innings_label]
-    )
-    how_out = how_out[["Batter_ID", "How Out", "Out_Percent"]]
-
-    # Extract the percentage of each wicket occurrence.
-    not_out = how_out.loc[
-        how_out["How Out"] == "NO", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": not_out_label}, axis=1)
-    bowled = how_out.loc[
-        how_out["How Out"] == "B", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": bowled_label}, axis=1)
-    caught = how_out.loc[
-        how_out["How Out"] == "C", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": caught_label}, axis=1)
-    lbw = how_out.loc[
-        how_out["How Out"] == "LB", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": lbw_label}, axis=1)
-    hit_wicket = how_out.loc[
-        how_out["How Out"] == "HW", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": hit_wicket_label}, axis=1)
-    stumped = how_out.loc[
-        how_out["How Out"] == "S", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": stumped_label}, axis=1)
-    run_out = how_out.loc[
-        how_out["How Out"] == "RO", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": run_out_label}, axis=1)
-    handled_ball = how_out.loc[
-        how_out["How Out"] == "HB", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": handled_ball_label}, axis=1)
-    hit_ball_twice = how_out.loc[
-        how_out["How Out"] == "HT", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": hit_ball_twice_label}, axis=1)
-    obstructed_field = how_out.loc[
-        how_out["How Out"] == "OF", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": obstructed_field_label}, axis=1)
-    timed_out = how_out.loc[
-        how_out["How Out"] == "TO", ["Batter_ID", "Out_Percent"]
-    ].rename({"Out_Percent": timed_out_label}, axis=1)
-
-    # Merge all occurrences into a single dataframe.
-    s = not_out
-    s = pd.merge(left=s, right=bowled, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=caught, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=lbw, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=hit_wicket, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=stumped, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=run_out, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=handled_ball, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=hit_ball_twice, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=obstructed_field, on="Batter_ID", how="outer")
-    s = pd.merge(left=s, right=timed_out, on="Batter_ID", how="outer")
-
-    # Remove all NaNs.
-    s.fillna({
-        not_out_label: 0, bowled_label: 0, caught_label: 0,
-        lbw_label: 0, hit_wicket_label: 0, stumped_label: 0,
-        run_out_label: 0, handled_ball_label: 0, hit_ball_twice_label: 0,
-        obstructed_field_label: 0, timed_out_label: 0
-    }, inplace=True
-    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percents = np.where(innings < 1, innings, how_out / innings)
 
-    # Merge wicket percentages into summary data.
-    summary = pd.merge(left=summary, right=s, on="Batter_ID", how="left")
-    return summary
+    return pd.DataFrame(
+        percents, index=groups.size().index,
+        columns=["{}_Percent".format(label) for label in HOW_OUT_LABELS.values()]
+    )
 
 
 # Function to summarise the spread of runs for each batter (e.g., % of dots, 1s, 2s,...).
-def _summarise_run_spread(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels.
-    dot_label = "Domestic_{}_Dot_Rate".format(format_label)
-    one_label = "Domestic_{}_One_Rate".format(format_label)
-    two_label = "Domestic_{}_Two_Rate".format(format_label)
-    three_label = "Domestic_{}_Three_Rate".format(format_label)
-    four_label = "Domestic_{}_Four_Rate".format(format_label)
-    five_label = "Domestic_{}_Five_Rate".format(format_label)
-    six_label = "Domestic_{}_Six_Rate".format(format_label)
-
+@_traced
+def _summarise_run_spread(df: pd.DataFrame):
     # Extract run and ball count for each batter.
-    runs = df[
-        ["Batter_ID", "Bat Score"]
-    ].groupby(["Batter_ID", "Bat Score"], as_index=False).size()
-    runs = runs.rename({"size": "Count"}, axis=1)
-    balls = df[
-        ["Batter_ID", "Bat Score"]
-    ].groupby("Batter_ID", as_index=False).size()
-    balls = balls.rename({"size": "Balls"}, axis=1)
+    labels = list(RUN_LABELS.values())
+    runs = _batted_innings(df).groupby(FORMAT_KEYS)[["Balls"] + labels].sum()
 
     # Determine rate of occurrence of each run type.
-    runs = pd.merge(left=runs, right=balls, on="Batter_ID", how="left")
-    runs["Count"] = np.where(
-        runs["Balls"] < 1,
-        runs["Balls"],
-        runs["Count"]/runs["Balls"]
-    )
+    balls = runs["Balls"].to_numpy()[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(balls < 1, balls, runs[labels].to_numpy() / balls)
 
-    # Extract run rates into individual dataframes.
-    dots = runs[
-        runs["Bat Score"] == 0][["Batter_ID", "Count"]
-                                ].rename({"Count": dot_label}, axis=1)
-    ones = runs[
-        runs["Bat Score"] == 1][["Batter_ID", "Count"]
-                                ].rename({"Count": one_label}, axis=1)
-    twos = runs[
-        runs["Bat Score"] == 2][["Batter_ID", "Count"]
-                                ].rename({"Count": two_label}, axis=1)
-    threes = runs[
-        runs["Bat Score"] == 3][["Batter_ID", "Count"]
-                                ].rename({"Count": three_label}, axis=1)
-    fours = runs[
-        runs["Bat Score"] == 4][["Batter_ID", "Count"]
-                                ].rename({"Count": four_label}, axis=1)
-    fives = runs[
-        runs["Bat Score"] == 5][["Batter_ID", "Count"]
-                                ].rename({"Count": five_label}, axis=1)
-    sixes = runs[
-        runs["Bat Score"] == 6][["Batter_ID", "Count"]
-                                ].rename({"Count": six_label}, axis=1)
-
-    # Combine run rates into single dataframe.
-    s = dots
-    s = pd.merge(left=s, right=ones, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=twos, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=threes, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=fours, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=fives, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=sixes, on="Batter_ID", how="left")
-
-    # Fill empty values (e.q., when someone has not scored a particular run).
-    s.fillna({
-        dot_label: 0, one_label: 0, two_label: 0, three_label: 0,
-        four_label: 0, five_label: 0, six_label: 0
-    }, inplace=True
-    )
-
-    # Merge rates into the summary.
-    summary = pd.merge(left=summary, right=s, on="Batter_ID", how="left")
-    return summary
+    return pd.DataFrame(rates, index=runs.index,
+                        columns=["{}_Rate".format(label) for label in labels])
 
 
 # Function to summarise the averages of each batter.
-def _summarise_average(df1: pd.DataFrame, df2: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels
-    runs_per_innings_label = "Domestic_{}_Runs_Per_Innings_Average".format(
-        format_label)
-    runs_per_out_label = "Domestic_{}_Runs_Per_Out_Average".format(
-        format_label)
-    innings_label = "Domestic_{}_Innings_Count".format(format_label)
-    outs_label = "Domestic_{}_Out_Count".format(format_label)
-
-    # Extract number of runs for each batter.
-    runs = df1[["Batter_ID", "Bat Score"]]
-    runs = runs.groupby(["Batter_ID"], as_index=False).sum()
+@_traced
+def _summarise_average(df: pd.DataFrame):
+    # Extract number of runs and innings for each batter.
+    runs = _batted_innings(df).groupby(FORMAT_KEYS).agg(
+        Runs=("Runs", "sum"), Innings=("Runs", "size")
+    )
 
     # Extract number of outs for each batter.
-    outs = df2[
-        ~df2["How Out"].isna()
-    ]["Batter Out Id"].to_frame().rename({"Batter Out Id": "Batter_ID"}, axis=1)
-    outs = outs.groupby(
-        "Batter_ID", as_index=False
-    ).size().rename({"size": outs_label}, axis=1)
-
-    # Extract number of innings for each batter.
-    innings = summary[["Batter_ID", innings_label]]
-
-    # Merge innings and outs into runs dataframe.
-    runs = pd.merge(left=runs, right=innings, on="Batter_ID", how="left")
-    runs = pd.merge(left=runs, right=outs, on="Batter_ID", how="left")
+    runs["Outs"] = df[df["Outs"] > 0].groupby(FORMAT_KEYS)["Outs"].sum()
 
     # Determine batting averages.
-    runs[runs_per_innings_label] = np.where(
-        runs[innings_label] < 1,
-        runs["Bat Score"],
-        runs["Bat Score"]/runs[innings_label]
+    runs["Runs_Per_Innings_Average"] = np.where(
+        runs["Innings"] < 1,
+        runs["Runs"],
+        runs["Runs"]/runs["Innings"]
     )
-    runs[runs_per_out_label] = np.where(
-        runs[outs_label] < 1,
-        runs["Bat Score"],
-        runs["Bat Score"]/runs[outs_label]
+    runs["Runs_Per_Out_Average"] = np.where(
+        runs["Outs"] < 1,
+        runs["Runs"],
+        runs["Runs"]/runs["Outs"]
     )
-    runs = runs[["Batter_ID", runs_per_innings_label, runs_per_out_label]]
 
-    # Merge averages into summary.
-    summary = pd.merge(left=summary, right=runs, on="Batter_ID", how="left")
-    return summary
+    return runs[["Runs_Per_Innings_Average", "Runs_Per_Out_Average"]]
 
 
 # Function to summarise the high score for each batter.
-def _summarise_high_score(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format label
-    high_score_label = "Domestic_{}_High_Score".format(format_label)
-
+@_traced
+def _summarise_high_score(df: pd.DataFrame):
     # Determine high score for each batter.
-    df = df[["Batter_ID", "Match_ID", "Innings", "Bat Score"]]
-    df = df.groupby(
-        ["Batter_ID", "Match_ID", "Innings"], as_index=False
-    ).sum()
-    df = df.groupby(
-        ["Batter_ID"], as_index=False
-    )["Bat Score"].max().rename({"Bat Score": high_score_label}, axis=1)
-
-    # Add high score to summary.
-    summary = pd.merge(left=summary, right=df, on="Batter_ID", how="left")
-    return summary
-
-
-# Function to summarise milestones.
-def _summarise_milestones(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels.
-    duck_label = "Domestic_{}_Duck_Rate".format(format_label)
-    start_label = "Domestic_{}_Start_Rate".format(format_label)
-    fifty_label = "Domestic_{}_50_Rate".format(format_label)
-    hundred_label = "Domestic_{}_100_Rate".format(format_label)
-    onefifty_label = "Domestic_{}_150_Rate".format(format_label)
-    twohundred_label = "Domestic_{}_200_Rate".format(format_label)
-    twofifty_label = "Domestic_{}_250_Rate".format(format_label)
-    threehundred_label = "Domestic_{}_300_Rate".format(format_label)
-    innings_label = "Domestic_{}_Innings_Count".format(format_label)
-
-    # Determine runs per game.
-    df = df.groupby(["Batter_ID", "Match_ID", "Innings"], as_index=False).sum()
-
-    # Extract different milestones.
-    ducks = df[
-        df["Bat Score"] == 0
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": duck_label}, axis=1
-    )
-    starts = df[
-        (df["Bat Score"] >= 1) & (df["Bat Score"] < 50)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": start_label}, axis=1
-    )
-    fifties = df[
-        (df["Bat Score"] >= 50) & (df["Bat Score"] < 100)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": fifty_label}, axis=1
-    )
-    hundreds = df[
-        (df["Bat Score"] >= 100) & (df["Bat Score"] < 150)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": hundred_label}, axis=1
-    )
-    onefifties = df[
-        (df["Bat Score"] >= 150) & (df["Bat Score"] < 200)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": onefifty_label}, axis=1
-    )
-    twohundreds = df[
-        (df["Bat Score"] >= 200) & (df["Bat Score"] < 250)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": twohundred_label}, axis=1
-    )
-    twofifties = df[
-        (df["Bat Score"] >= 250) & (df["Bat Score"] < 300)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": twofifty_label}, axis=1
-    )
-    threehundreds = df[
-        (df["Bat Score"] >= 300) & (df["Bat Score"] < 350)
-    ].groupby("Batter_ID", as_index=False).size().rename(
-        {"size": threehundred_label}, axis=1
+    return _batted_innings(df).groupby(FORMAT_KEYS).agg(
+        High_Score=("Runs", "max")
     )
 
-    # Merge milestones into a single dataframe.
-    s = summary["Batter_ID"].to_frame()
-    s = pd.merge(left=s, right=ducks, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=starts, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=fifties, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=hundreds, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=onefifties, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=twohundreds, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=twofifties, on="Batter_ID", how="left")
-    s = pd.merge(left=s, right=threehundreds, on="Batter_ID", how="left")
-
-    # Fill NaN fields.
-    s.fillna({
-        duck_label: 0, start_label: 0, fifty_label: 0,
-        hundred_label: 0, onefifty_label: 0, twohundred_label: 0,
-        twofifty_label: 0, threehundred_label: 0
-    }, inplace=True
-    )
 
-    # Convert each milestone to a percentage.
-    innings = summary[summary[innings_label]
-                      != 0][["Batter_ID", innings_label]]
-    s = pd.merge(left=s, right=innings, on="Batter_ID", how="left")
-    s[duck_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[duck_label]/s[innings_label]
-    )
-    s[start_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[start_label]/s[innings_label]
-    )
-    s[fifty_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[fifty_label]/s[innings_label]
-    )
-    s[hundred_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[hundred_label]/s[innings_label]
-    )
-    s[onefifty_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[onefifty_label]/s[innings_label]
-    )
-    s[twohundred_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[twohundred_label]/s[innings_label]
-    )
-    s[twofifty_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[twofifty_label]/s[innings_label]
-    )
-    s[threehundred_label] = np.where(
-        s[innings_label] < 1,
-        s[innings_label],
-        s[threehundred_label]/s[innings_label]
+# Function to summarise milestones.
+@_traced
+def _summarise_milestones(df: pd.DataFrame, milestones: dict = MILESTONES, limit: int = MILESTONE_LIMIT):
+    # Find the milestone bin of each innings, with scores past the limit in none.
+    labels = sorted(milestones, key=milestones.get)
+    edges = [milestones[label] for label in labels] + [limit]
+    bins = np.searchsorted(edges, df["Runs"].to_numpy(), side="right") - 1
+    binned = (bins >= 0) & (bins < len(labels))
+
+    # Count the innings of each batter and format in each bin.
+    groups = df.groupby(FORMAT_KEYS)
+    codes = groups.ngroup().to_numpy()
+    counts = np.bincount(
+        codes[binned] * len(labels) + bins[binned],
+        minlength=groups.ngroups * len(labels)
+    ).reshape(groups.ngroups, len(labels))
+
+    # Convert each milestone to a percentage of innings.
+    innings = groups.size()
+    return pd.DataFrame(
+        counts / innings.to_numpy()[:, np.newaxis], index=innings.index,
+        columns=["{}_Rate".format(label) for label in labels]
     )
 
-    # Drop unnecessary columns.
-    s.drop(columns=[innings_label], inplace=True)
-
-    # Merge milestones into summary dataframe.
-    summary = pd.merge(left=summary, right=s, on="Batter_ID", how="left")
-
-    return summary
 
 # Function to summarise the batting position of each batter.
-
-
-def _summarise_batting_position(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels
-    first_ball_label = "Domestic_{}_Average_Entering_Ball".format(format_label)
-    entering_score_label = "Domestic_{}_Average_Entering_Score".format(
-        format_label)
-    entering_wickets_label = "Domestic_{}_Average_Entering_Wicket".format(
-        format_label)
-
-    # Extract first ball of each batter.
-    df = df.groupby(
-        ["Batter_ID", "Match_ID", "Innings"], as_index=False
-    )[["Cum Inning Balls", "Cum Inning Score", "Cum Inning Wickets"]].first()
-
+@_traced
+def _summarise_batting_position(df: pd.DataFrame):
     # Summarise batting positions.
-    df = df.groupby(
-        ["Batter_ID"], as_index=False
-    ).agg({
-        "Cum Inning Balls": "mean",
-        "Cum Inning Score": "mean",
-        "Cum Inning Wickets": "median"
-    })
-    df.rename({
-        "Cum Inning Balls": first_ball_label,
-        "Cum Inning Score": entering_score_label,
-        "Cum Inning Wickets": entering_wickets_label
-    }, axis=1, inplace=True)
-
-    # Merge summarised data into summary.
-    summary = pd.merge(left=summary, right=df, on="Batter_ID", how="left")
-
-    return summary
+    return df.groupby(FORMAT_KEYS).agg(
+        Average_Entering_Ball=("Entering_Ball", "mean"),
+        Average_Entering_Score=("Entering_Score", "mean"),
+        Average_Entering_Wicket=("Entering_Wicket", "median")
+    )
 
 
 # Function to summarise the number of balls a batter has faced.
-def _summarise_balls_per_innings(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels.
-    ball_label = "Domestic_{}_Average_Ball_Count".format(format_label)
-    innings_label = "Domestic_{}_Innings_Count".format(format_label)
-
+@_traced
+def _summarise_balls_per_innings(df: pd.DataFrame):
     # Extract the total number of balls faced and innings played.
-    balls = df[["Batter_ID", "Bat Score"]]
-    balls = balls.groupby(
-        ["Batter_ID"], as_index=False
-    )["Bat Score"].size().rename({"size": ball_label}, axis=1)
-    innings = summary[["Batter_ID", innings_label]]
+    balls = df.groupby(FORMAT_KEYS).agg(
+        Balls=("Balls", "sum"), Innings=("Balls", "size")
+    )
 
     # Determine the average number of balls faced per innings.
-    balls = pd.merge(left=balls, right=innings, on="Batter_ID", how="left")
-    balls[ball_label] = np.where(
-        balls[innings_label] < 1,
-        balls[innings_label],
-        balls[ball_label]/balls[innings_label]
+    balls["Average_Ball_Count"] = np.where(
+        balls["Innings"] < 1,
+        balls["Innings"],
+        balls["Balls"]/balls["Innings"]
     )
-    balls = balls[["Batter_ID", ball_label]]
 
-    # Merge average number of balls faced into summary data.
-    summary = pd.merge(left=summary, right=balls, on="Batter_ID", how="left")
-
-    return summary
+    return balls[["Average_Ball_Count"]]
 
 
 # Function to summarise the false shots played by each batter.
-def _summarise_false_shots(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels
-    false_shot_label = "Domestic_{}_False_Shot_Rate".format(format_label)
-
-    # Extract balls that were false shots.
-    false_shots = df[
-        (df["Inside Edge"] == "Y") |
-        (df["Outside Edge"] == "Y") |
-        (df["Play and Miss"] == "Y") |
-        (df["Hit on Pads"] == "Y") |
-        (df["Hit on Body"] == "Y") |
-        (df["Contact Error"] == "Y") |
-        (df["Opportunity"] == "Y")
-    ][["Batter_ID", "Bat Score"]]
-    false_shots = false_shots.groupby(
-        ["Batter_ID"], as_index=False
-    ).size().rename({"size": false_shot_label}, axis=1)
-
-    # Determine the number of balls faced by each batter.
-    balls = df[["Batter_ID", "Bat Score"]]
-    balls = balls.groupby(
-        ["Batter_ID"], as_index=False
-    )["Bat Score"].size().rename({"size": "Balls"}, axis=1)
+@_traced
+def _summarise_false_shots(df: pd.DataFrame):
+    # Extract the number of false shots and balls faced by each batter.
+    false_shots = df.groupby(FORMAT_KEYS)[["Balls", "False_Shots"]].sum()
 
     # Determine the percentage of false shots per batter.
-    false_shots = pd.merge(
-        left=balls,
-        right=false_shots,
-        on="Batter_ID",
-        how="left"
-    )
-    false_shots[false_shot_label] = np.where(
+    false_shots["False_Shot_Rate"] = np.where(
         false_shots["Balls"] < 1,
         false_shots["Balls"],
-        false_shots[false_shot_label]/false_shots["Balls"]
-    )
-    false_shots = false_shots[["Batter_ID", false_shot_label]]
-
-    # Add the false shot data to the summary.
-    summary = pd.merge(
-        left=summary,
-        right=false_shots,
-        on="Batter_ID",
-        how="left"
+        false_shots["False_Shots"]/false_shots["Balls"]
     )
-    return summary
 
+    return false_shots[["False_Shot_Rate"]]
 
-# Function to summarise the strike rate of each batter.
-def _summarise_strike_rate(df: pd.DataFrame, summary: pd.DataFrame, format_label: str):
-    # Format labels
-    strike_rate_label = "Domestic_{}_Strike_Rate".format(format_label)
 
+# Function to summarise the strike rate of each batter.
+@_traced
+def _summarise_strike_rate(df: pd.DataFrame):
     # Extract runs and balls.
-    df = df[["Batter_ID", "Bat Score"]]
-    df = df.groupby("Batter_ID", as_index=False).agg(
-        {"Bat Score": ["sum", "count"]})
-    df.columns = df.columns.to_flat_index()
-    df.rename({df.columns[0]: "Batter_ID", df.columns[1]: strike_rate_label, df.columns[2]: "Balls"}, axis=1, inplace=True)
+    df = df.groupby(FORMAT_KEYS)[["Runs", "Balls"]].sum()
 
     # Summarise strike rate.
-    df[strike_rate_label] = np.where(
+    df["Strike_Rate"] = np.where(
         df["Balls"] < 1,
         df["Balls"],
-        df[strike_rate_label]/df["Balls"]
+        df["Runs"]/df["Balls"]
     )
-    df = df[["Batter_ID", strike_rate_label]]
 
-    # Add strike rate to dataframe.
-    summary = pd.merge(left=summary, right=df, on="Batter_ID", how="left")
-    return summary
+    return df[["Strike_Rate"]]
 
 
 # Function to summarise the run contribution of each batter to their team.
-def _summarise_team_run_contribution(df: pd.DataFrame, summary: pd.DataFrame, format_label: str, batter_ids: list):
-    # Format labels.
-    high_score_label = "Domestic_{}_Team_Run_Contribution_Percent".format(
-        format_label)
-
-    # Extract the final score for each team in each match/innings.
-    team_total = df.groupby(
-        ["Match_ID", "Innings", "Team Batting Id"], as_index=False).last()
-    team_total = team_total[["Match_ID", "Innings", "Team Batting Id", "Cum Inning Score"]].rename(
-        {"Cum Inning Score": "Team_Total"}, axis=1)
-
-    # Align the total number of runs scored in each game with each batter.
-    team_total = pd.merge(left=df, right=team_total, on=[
-                          "Match_ID", "Innings", "Team Batting Id"], how="left")
-    team_total = team_total[team_total["Batter_ID"].isin(
-        batter_ids)][["Batter_ID", "Match_ID", "Innings", "Team_Total"]]
-    team_total.drop_duplicates(
-        ["Batter_ID", "Match_ID", "Innings"], inplace=True)
-
-    # Determine the total number of runs each batters teams scored.
-    team_total = team_total[["Batter_ID", "Team_Total"]]
-    team_total = team_total.groupby("Batter_ID", as_index=False).sum()
-
-    # Extract the number of runs each batter has scored.
-    total_runs = df[df["Batter_ID"].isin(batter_ids)]
-    total_runs = total_runs.groupby("Batter_ID", as_index=False)[
-        "Bat Score"].sum()
-    total_runs.rename({"Bat Score": high_score_label}, axis=1, inplace=True)
+@_traced
+def _summarise_team_run_contribution(df: pd.DataFrame):
+    # Determine the total number of runs each batter and their teams scored.
+    total_runs = df.groupby(FORMAT_KEYS)[["Runs", "Team_Total"]].sum()
 
     # Determine each batters contribution to their teams as a percentage.
-    total_runs = pd.merge(left=total_runs, right=team_total,
-                          on="Batter_ID", how="left")
-    total_runs[high_score_label] = np.where(
+    total_runs["Team_Run_Contribution_Percent"] = np.where(
         total_runs["Team_Total"] < 1,
         total_runs["Team_Total"],
-        total_runs[high_score_label]/total_runs["Team_Total"]
+        total_runs["Runs"]/total_runs["Team_Total"]
     )
-    total_runs = total_runs[["Batter_ID", high_score_label]]
 
-    # Merge team run contribution into summary.
-    summary = pd.merge(left=summary, right=total_runs,
-                       on="Batter_ID", how="left")
-    return summary
+    return total_runs[["Team_Run_Contribution_Percent"]]
 
 
 # Function to summarise how often a batter is the high scorer of their team.
-def _summarise_team_highest_scorer(df: pd.DataFrame, summary: pd.DataFrame, format_label: str, batter_ids: list):
-    # Format labels
-    high_score_label = "Domestic_{}_Team_High_Score_Percent".format(
-        format_label)
-    innings_label = "Domestic_{}_Innings_Count".format(format_label)
-
-    # Extract the number of times each batter was the highest scorer.
-    highscore = df.groupby(["Match_ID", "Innings", "Team Batting Id",
-                           "Batter_ID"], as_index=False)["Bat Score"].sum()
-    idx = highscore.groupby(["Match_ID", "Innings", "Team Batting Id"])[
-        "Bat Score"].transform(max) == highscore["Bat Score"]
-    highscore = highscore[idx]
-    highscore = highscore[highscore["Batter_ID"].isin(batter_ids)]
-    highscore = highscore.groupby("Batter_ID", as_index=False).size().rename({
-        "size": high_score_label}, axis=1)
-
-    # Convert number of highest scores to percentage.
-    innings = summary[["Batter_ID", innings_label]]
-    innings = innings[innings[innings_label] > 0]
-    highscore = pd.merge(left=innings, right=highscore,
-                         on="Batter_ID", how="left")
-    highscore[high_score_label] = np.where(
-        highscore[innings_label] < 1,
-        highscore[innings_label],
-        highscore[high_score_label]/highscore[innings_label]
-    )
-    highscore = highscore[["Batter_ID", high_score_label]]
-    highscore.fillna({high_score_label: 0}, inplace=True)
-
-    # Add to summary.
-    summary = pd.merge(left=summary, right=highscore,
-                       on="Batter_ID", how="left")
-    return summary
+@_traced
+def _summarise_team_highest_scorer(df: pd.DataFrame):
+    # Determine how often each batter was the highest scorer of their team.
+    highscore = df[FORMAT_KEYS].assign(
+        Team_High_Score_Percent=df["Runs"] == df["Team_High_Score"]
+    )
+
+    return highscore.groupby(FORMAT_KEYS).mean()
+
+
+#---------------------------- Feature Definitions ----------------------------#
+# Feature families added to the summary after the batter attributes, with the
+# columns they produce, the values filling the columns of batters without
+# them, the types of the filled columns, and the constants they depend on
+# besides those shared by every family.
+SUMMARY_FEATURES = {
+    "odi_average": {
+        "build": _summarise_batter_odi_average,
+        "columns": ["International_One_Day_Batting_Average"],
+        "fill": {}, "dtypes": {},
+        "params": []
+    },
+    "matches_played": {
+        "build": _summarise_batter_matches_played,
+        "columns": _format_columns(["Innings_Count", "Match_Count", "Win_Rate"]) +
+                   _format_columns(["Match_Percent"]) +
+                   _format_columns(["Innings_Percent"]),
+        "fill": dict.fromkeys(
+            _format_columns(["Innings_Count", "Match_Count", "Win_Rate"]), 0),
+        "dtypes": dict.fromkeys(_format_columns(["Innings_Count", "Match_Count"]), int),
+        "params": []
+    },
+    "outs": {
+        "build": _summarise_batter_outs,
+        "columns": _format_columns(
+            ["{}_Percent".format(label) for label in HOW_OUT_LABELS.values()]),
+        "fill": {}, "dtypes": {},
+        "params": []
+    },
+    "runs": {
+        "build": _summarise_batter_runs,
+        "columns": _format_columns(
+            ["{}_Rate".format(label) for label in RUN_LABELS.values()] +
+            ["Runs_Per_Innings_Average", "Runs_Per_Out_Average", "High_Score"]),
+        "fill": {}, "dtypes": {},
+        "params": []
+    },
+    "milestones": {
+        "build": _summarise_batter_milestones,
+        "columns": _format_columns(["{}_Rate".format(label) for label in
+                                    sorted(MILESTONES, key=MILESTONES.get)]),
+        "fill": {}, "dtypes": {},
+        "params": ["MILESTONES", "MILESTONE_LIMIT"]
+    },
+    "batting_position": {
+        "build": _summarise_batter_batting_position,
+        "columns": _format_columns(["Average_Entering_Ball",
+                                    "Average_Entering_Score",
+                                    "Average_Entering_Wicket"]),
+        "fill": {}, "dtypes": {},
+        "params": []
+    },
+    "style": {
+        "build": _summarise_batter_style,
+        "columns": _format_columns(["Average_Ball_Count", "False_Shot_Rate",
+                                    "Strike_Rate"]),
+        "fill": {}, "dtypes": {},
+        "params": []
+    },
+    "team_contribution": {
+        "build": _summarise_batter_team_contribution,
+        "columns": _format_columns(["Team_Run_Contribution_Percent",
+                                    "Team_High_Score_Percent"]),
+        "fill": {}, "dtypes": {},
+        "params": []
+    }
+}
+
+# Constants shared by the batter attributes and every feature family.
+FEATURE_PARAMS = ["FORMATS", "COLUMN_DTYPES"]
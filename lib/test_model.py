@@ -6,9 +6,11 @@ from IPython.display import display, HTML
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from sklearn.ensemble import RandomForestRegressor
 from lib.helpers import _read_dataframe, _create_test_train_split
+from lib.instrumentation import _traced
 
 
 #------------------------------- Model Testing -------------------------------#
+@_traced
 def test_model(model: RandomForestRegressor):
   # Read in the reduced batter summary.
   summary = _read_dataframe("/Batter_Summary_Reduced.txt", False)
@@ -1,9 +1,11 @@
 #---------------------------------- Imports ----------------------------------#
 from sklearn.ensemble import RandomForestRegressor
 from lib.helpers import _read_dataframe, _create_test_train_split
+from lib.instrumentation import _traced
 
 
 #------------------------------ Model Training -------------------------------#
+@_traced
 def train_model(model: RandomForestRegressor):
     # Read in the reduced batter summary.
     df = _read_dataframe("/Batter_Summary_Reduced.txt", False);
@@ -0,0 +1,118 @@
+#---------------------------------- Imports ----------------------------------#
+import functools
+import pandas as pd
+from lib.constants import SUMMARY_WORKERS, FEATURE_CACHE
+from lib.clean_raw_data import clean_raw_data, RAW_FILES, STAGED_DELIVERIES, \
+    _read_match_data, _clean_match_data, _stage_delivery_data, \
+    _read_staged_deliveries, _batter_match_incidence, _eligible_cohort, \
+    _write_incidence, _clean_matches_and_deliveries, _raw_file_sizes, \
+    _update_key, _read_update_state, _write_update_state
+from lib.summarise_data import summarise_data, MATCH_COLUMNS, \
+    _summarise_batters, _merge_partial_innings, _complete_innings
+from lib.helpers import _write_dataframe_to_file, _write_dataframe_chunks, \
+    _remove_data_file, _apply_column_dtypes, _file_state, _file_tail_hash
+from lib.instrumentation import _traced
+
+
+#---------------------------- Incremental Update -----------------------------#
+# Update the clean data and summary with the rows appended to the raw data
+# since it was last cleaned, rebuilding them in full when an update would not
+# match a full rebuild.
+@_traced
+def update_data(workers: int = SUMMARY_WORKERS, cache: bool = FEATURE_CACHE):
+    state = _read_update_state()
+    if not _is_appended(state):
+        return _rebuild_data(workers, cache)
+    raw_sizes = _raw_file_sizes()
+
+    # Clean every match again, as there are few, and stage the appended
+    # deliveries of the matches not cleaned before.
+    match_data = _clean_match_data(_read_match_data())
+    new_matches = match_data[~match_data["Match Id"].isin(state["cleaned"])]
+    delivered = set()
+    new_innings, new_partials = _stage_delivery_data(
+        new_matches, state["raw"]["/Deliveries.txt"]["offset"], delivered)
+
+    # Deliveries appended to cleaned matches, or new matches with deliveries
+    # read before, can only be placed by a full rebuild.
+    if delivered.intersection(state["cleaned"]) or \
+            new_matches["Match Id"].isin(state["delivered"]).any():
+        _remove_data_file(STAGED_DELIVERIES)
+        return _rebuild_data(workers, cache)
+
+    # Re-evaluate which batters have played enough innings.
+    innings_data = pd.concat(
+        [state["batter_matches"], new_innings]).drop_duplicates(ignore_index=True)
+    incidence = _batter_match_incidence(innings_data)
+    _, batter_ids, kept_ids = _eligible_cohort(incidence)
+    batter_data = pd.DataFrame({"Batter_ID": batter_ids})
+    kept_data = _clean_matches_and_deliveries(kept_ids, match_data)
+
+    # Matches cleaned before that newly have an eligible batter need their
+    # deliveries read again in order, so are rebuilt in full.
+    kept_before = kept_data[kept_data["Match Id"].isin(state["cleaned"])]
+    if sorted(kept_before["Match Id"].tolist()) != state["kept"]:
+        _remove_data_file(STAGED_DELIVERIES)
+        return _rebuild_data(workers, cache)
+
+    # Write the clean data, appending the deliveries of the new matches.
+    _write_dataframe_to_file(batter_data, "/Batter_Summary.txt")
+    _write_dataframe_to_file(kept_data, "/Matches_Clean.txt")
+    _write_incidence(incidence)
+    if _file_state(STAGED_DELIVERIES) is not None:
+        _write_dataframe_chunks(_read_staged_deliveries(kept_data),
+                                "/Deliveries_Clean.txt", append=True)
+        _remove_data_file(STAGED_DELIVERIES)
+
+    # Merge the partial innings of the new matches into the recorded ones.
+    partials = state["partials"]
+    if new_partials is not None:
+        partials = _merge_partial_innings([partials, new_partials])
+    _write_update_state(
+        raw_sizes, match_data["Match Id"], kept_data["Match Id"],
+        delivered.union(state["delivered"]), innings_data, partials)
+
+    # Summarise the batters from the innings of the kept matches.
+    summary = _summarise_batters(
+        batter_data, functools.partial(_updated_innings, partials, kept_data),
+        workers, cache)
+    _write_dataframe_to_file(summary, "/Batter_Summary.txt")
+
+    return "updated"
+
+
+# Clean and summarise the raw data in full.
+def _rebuild_data(workers: int, cache: bool):
+    clean_raw_data()
+    summarise_data(workers=workers, cache=cache)
+
+    return "rebuilt"
+
+
+# Check that the state was recorded by the current code and constants, that
+# the raw data has only been appended to and that the clean deliveries have
+# not changed since.
+def _is_appended(state: dict):
+    if state is None or state["key"] != _update_key():
+        return False
+    if state["clean"] != _file_state("/Deliveries_Clean.txt"):
+        return False
+
+    raw_sizes = _raw_file_sizes()
+    return all(
+        filename in raw_sizes and filename in state["raw"] and
+        raw_sizes[filename] >= state["raw"][filename]["offset"] and
+        _file_tail_hash(filename, state["raw"][filename]["offset"]) ==
+        state["raw"][filename]["tail"]
+        for filename in RAW_FILES
+    )
+
+
+# Complete the innings of the kept matches from the merged partial innings.
+def _updated_innings(partials: tuple, match_data: pd.DataFrame):
+    match_ids = match_data["Match Id"]
+    partials = tuple(part[part["Match_ID"].isin(match_ids)] for part in partials)
+
+    match_data = _apply_column_dtypes(match_data[MATCH_COLUMNS])
+    match_data = match_data.rename(columns={"Match Id": "Match_ID"})
+    return _complete_innings(partials, match_data)